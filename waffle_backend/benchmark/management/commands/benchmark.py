@@ -0,0 +1,225 @@
+import json
+import math
+import subprocess
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.test import Client
+from django.utils import timezone
+
+from benchmark.scenarios import SCENARIOS, build_context, get_scenarios
+from user.authentication import get_token_cache
+from waffle_backend import db
+
+
+class QueryCounter(object):
+
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(values, p):
+    # Nearest-rank percentile of an already sorted list.
+    return values[max(min(math.ceil(p / 100 * len(values)) - 1, len(values) - 1), 0)]
+
+
+def get_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=str(settings.BASE_DIR),
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True)
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def get_host():
+    # Requests go through host validation, so use a host the settings accept.
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*':
+            return host.lstrip('.')
+    return 'localhost'
+
+
+def cleanup_connections():
+    # Servers close obsolete connections around every request but the test client does not, so
+    # CONN_MAX_AGE would make no difference without this. A surrounding transaction, e.g. in tests,
+    # keeps its connection.
+    if not connection.in_atomic_block:
+        close_old_connections()
+
+
+def clear_caches():
+    for cache in caches.all():
+        cache.clear()
+    get_token_cache().clear()
+
+
+class Storm(object):
+    # Background load: threads sending one scenario in a loop while the others are measured, e.g. a
+    # login storm, to see how it affects their latency. Each thread has its own client and connection.
+
+    def __init__(self, scenario, context, threads):
+        self.request = scenario.build(context)
+        self.stop_event = threading.Event()
+        self.statuses = Counter()
+        self.lock = threading.Lock()
+        self.threads = [threading.Thread(target=self.loop, daemon=True) for _ in range(threads)]
+
+    def loop(self):
+        client = Client(HTTP_HOST=get_host())
+        method, path, kwargs = self.request
+        try:
+            while not self.stop_event.is_set():
+                response = getattr(client, method)(path, **kwargs)
+                with self.lock:
+                    self.statuses[response.status_code] += 1
+        finally:
+            connection.close()
+
+    def __enter__(self):
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join()
+
+
+class Command(BaseCommand):
+    help = "Run API scenarios through the test client and report latency, queries and allocations"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            choices=[scenario.name for scenario in SCENARIOS])
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--cold', action='store_true', help="Clear every cache before each request")
+        parser.add_argument('--output', help="Write the results as JSON to this path")
+        parser.add_argument('--compare', help="Compare against results previously written with --output")
+        parser.add_argument('--storm', choices=[scenario.name for scenario in SCENARIOS],
+                            help="Send this scenario from background threads during the measurements")
+        parser.add_argument('--storm-threads', type=int, default=8)
+
+    def handle(self, *args, **options):
+        context = build_context()
+        if context is None:
+            raise CommandError("Not enough data to benchmark, run 'generate_data' first")
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be positive")
+
+        client = Client(HTTP_HOST=get_host())
+        results = {}
+        storm = None
+        with ExitStack() as stack:
+            if options['storm']:
+                storm = stack.enter_context(Storm(get_scenarios([options['storm']])[0], context,
+                                                  options['storm_threads']))
+            self.stdout.write("{:<20} {:>9} {:>9} {:>9} {:>8} {:>8} {:>10} {:>9}".format(
+                'scenario', 'p50 ms', 'p95 ms', 'p99 ms', 'queries', 'connects', 'alloc KB', 'bytes'
+            ))
+            for scenario in get_scenarios(options['scenarios']):
+                result = results[scenario.name] = self.run(client, scenario, context, options)
+                self.stdout.write("{:<20} {:>9.2f} {:>9.2f} {:>9.2f} {:>8.1f} {:>8.2f} {:>10.1f} {:>9}{}".format(
+                    scenario.name, result['p50'], result['p95'], result['p99'], result['queries'],
+                    result['connects'], result['allocated_kb'], result['size'],
+                    '' if result['status'] == [200] else '  status {}'.format(result['status']),
+                ))
+        if storm is not None:
+            self.stdout.write("storm {} x{}: {}".format(options['storm'], options['storm_threads'], ', '.join(
+                '{} {}'.format(count, code) for code, count in sorted(storm.statuses.items())
+            )))
+
+        report = {
+            'commit': get_commit(),
+            'database': connection.vendor,
+            'created_at': timezone.now().isoformat(),
+            'repeat': options['repeat'],
+            'cold': options['cold'],
+            'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+            'storm': options['storm'] and {
+                'scenario': options['storm'],
+                'threads': options['storm_threads'],
+                'statuses': {str(code): count for code, count in storm.statuses.items()},
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+        if options['compare']:
+            with open(options['compare']) as f:
+                self.compare(json.load(f), report)
+
+    def run(self, client, scenario, context, options):
+        method, path, kwargs = scenario.build(context)
+
+        def request():
+            if options['cold']:
+                clear_caches()
+            cleanup_connections()
+            try:
+                return getattr(client, method)(path, **kwargs)
+            finally:
+                cleanup_connections()
+
+        for _ in range(options['warmup']):
+            request()
+
+        counter = QueryCounter()
+        latencies = []
+        statuses = set()
+        # New connections per request; only counted with the backends of waffle_backend.db.
+        connects = db.stats()['connects']
+        with connection.execute_wrapper(counter):
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                response = request()
+                latencies.append((time.perf_counter() - start) * 1000)
+                statuses.add(response.status_code)
+        connects = db.stats()['connects'] - connects
+
+        # Allocations are traced on one extra request, since tracing slows every allocation down.
+        tracemalloc.start()
+        response = request()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        latencies.sort()
+        return {
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'mean': sum(latencies) / len(latencies),
+            'queries': counter.queries / options['repeat'],
+            'connects': connects / options['repeat'],
+            'allocated_kb': peak / 1024,
+            'size': len(response.content),
+            'status': sorted(statuses),
+        }
+
+    def compare(self, baseline, report):
+        self.stdout.write("\nCompared with {} ({})".format(baseline.get('commit'), baseline.get('database')))
+        for name, result in report['results'].items():
+            before = baseline['results'].get(name)
+            if before is None:
+                continue
+            self.stdout.write("{:<20} {}".format(name, '  '.join(
+                '{} {:.2f} -> {:.2f}{}'.format(
+                    field, before[field], result[field],
+                    ' ({:+.0%})'.format((result[field] - before[field]) / before[field]) if before[field] else '',
+                )
+                for field in ('p50', 'p95', 'queries', 'allocated_kb')
+            )))
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+
+from benchmark.management.commands.benchmark import get_host, percentile
+from benchmark.scenarios import SCENARIOS, build_context, get_scenarios
+
+DEFAULT_SCENARIOS = ('seminar-list', 'seminar-retrieve', 'survey-list', 'os-list')
+
+
+class Command(BaseCommand):
+    help = ("Send read scenarios from concurrent clients through the WSGI and ASGI handlers of this process "
+            "and report throughput and latency")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            choices=[scenario.name for scenario in SCENARIOS if scenario.method == 'get'])
+        parser.add_argument('--concurrency', type=int, action='append', dest='concurrency',
+                            help="Clients sending requests at the same time, 1, 8 and 32 by default")
+        parser.add_argument('--requests', type=int, default=200, help="Requests per client count and mode")
+        parser.add_argument('--threads', type=int, default=1,
+                            help="Threads of the sync worker, i.e. requests it serves at the same time")
+
+    def handle(self, *args, **options):
+        context = build_context()
+        if context is None:
+            raise CommandError("Not enough data to benchmark, run 'generate_data' first")
+        if options['requests'] < 1 or options['threads'] < 1:
+            raise CommandError("--requests and --threads must be positive")
+
+        self.stdout.write("async views {}, {} read workers, {} sync worker threads".format(
+            'enabled' if settings.ASYNC_VIEWS['ENABLED'] else 'disabled',
+            settings.ASYNC_VIEWS['WORKERS'], options['threads'],
+        ))
+        self.stdout.write("{:<20} {:<5} {:>7} {:>9} {:>9} {:>9} {:>7}".format(
+            'scenario', 'mode', 'clients', 'req/s', 'p50 ms', 'p95 ms', 'errors'
+        ))
+        for scenario in get_scenarios(options['scenarios'] or DEFAULT_SCENARIOS):
+            request = scenario.build(context)
+            for concurrency in options['concurrency'] or (1, 8, 32):
+                for mode, run in (('wsgi', self.run_wsgi), ('asgi', self.run_asgi)):
+                    elapsed, latencies, statuses, errors = run(request, concurrency, options)
+                    latencies.sort()
+                    if latencies:
+                        results = ['{:.1f}'.format(len(latencies) / elapsed),
+                                   '{:.2f}'.format(percentile(latencies, 50)),
+                                   '{:.2f}'.format(percentile(latencies, 95))]
+                    else:
+                        results = ['n/a'] * 3
+                    self.stdout.write("{:<20} {:<5} {:>7} {:>9} {:>9} {:>9} {:>7}{}".format(
+                        scenario.name, mode, concurrency, *results, len(errors),
+                        '' if statuses <= {200} else '  status {}'.format(sorted(statuses)),
+                    ))
+                    for error in sorted(set(errors)):
+                        self.stderr.write("{} {}: {}".format(scenario.name, mode, error))
+
+    def split(self, total, concurrency):
+        return [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+
+    def run_wsgi(self, request, concurrency, options):
+        # Each client is a thread; a semaphore stands for the worker threads serving them, so requests
+        # beyond --threads wait for a free one as they would in front of a sync server.
+        method, path, kwargs = request
+        worker = threading.Semaphore(options['threads'])
+        latencies = []
+        statuses = set()
+        errors = []
+
+        def loop(count):
+            client = Client(HTTP_HOST=get_host())
+            try:
+                for _ in range(count):
+                    start = time.perf_counter()
+                    try:
+                        with worker:
+                            response = getattr(client, method)(path, **kwargs)
+                    except Exception as e:
+                        # Counted apart from the latencies, which only cover answered requests.
+                        errors.append(repr(e))
+                        continue
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    statuses.add(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=loop, args=(count, ))
+                   for count in self.split(options['requests'], concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start, latencies, statuses, errors
+
+    def run_asgi(self, request, concurrency, options):
+        # All clients share one event loop, like the requests of one ASGI worker process.
+        method, path, kwargs = request
+        # Django 3.1's AsyncClient takes raw header names and always sends 'Host: testserver'.
+        kwargs = {
+            key[5:].lower().replace('_', '-') if key.startswith('HTTP_') else key: value
+            for key, value in kwargs.items()
+        }
+        latencies = []
+        statuses = set()
+        errors = []
+
+        async def loop(count):
+            client = AsyncClient()
+            for _ in range(count):
+                start = time.perf_counter()
+                try:
+                    response = await getattr(client, method)(path, **kwargs)
+                except Exception as e:
+                    errors.append(repr(e))
+                    continue
+                latencies.append((time.perf_counter() - start) * 1000)
+                statuses.add(response.status_code)
+
+        async def main():
+            await asyncio.gather(*[loop(count) for count in self.split(options['requests'], concurrency)])
+
+        start = time.perf_counter()
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            asyncio.run(main())
+        return time.perf_counter() - start, latencies, statuses, errors
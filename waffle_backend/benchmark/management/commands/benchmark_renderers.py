@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from rest_framework.renderers import JSONRenderer
+
+from benchmark.management.commands.benchmark import get_host
+from benchmark.scenarios import SCENARIOS, build_context, get_scenarios
+from waffle_backend import renderers
+from waffle_backend.renderers import FastJSONRenderer, MessagePackRenderer
+
+
+def get_renderers():
+    result = [('json', JSONRenderer()), ('fast', FastJSONRenderer())]
+    if renderers.msgpack is not None:
+        result.append(('msgpack', MessagePackRenderer()))
+    return result
+
+
+class Command(BaseCommand):
+    help = "Render the data of API scenarios with each renderer and report render time per MB"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            choices=[scenario.name for scenario in SCENARIOS if scenario.method == 'get'])
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        context = build_context()
+        if context is None:
+            raise CommandError("Not enough data to benchmark, run 'generate_data' first")
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be positive")
+
+        self.stdout.write("orjson {}, msgpack {}".format(
+            'installed' if renderers.orjson is not None else 'missing',
+            'installed' if renderers.msgpack is not None else 'missing',
+        ))
+        self.stdout.write("{:<20} {:<8} {:>10} {:>10} {:>10}".format('scenario', 'renderer', 'bytes', 'ms', 'ms/MB'))
+        client = Client(HTTP_HOST=get_host())
+        for scenario in get_scenarios(options['scenarios']):
+            if scenario.method != 'get':
+                continue
+            method, path, kwargs = scenario.build(context)
+            # The view's own output, before rendering, so only the renderers are timed.
+            data = client.get(path, **kwargs).data
+            for name, renderer in get_renderers():
+                size, elapsed = self.run(renderer, data, options['repeat'])
+                self.stdout.write("{:<20} {:<8} {:>10} {:>10.3f} {:>10.2f}".format(
+                    scenario.name, name, size, elapsed, elapsed / (size / 1024 / 1024) if size else 0,
+                ))
+
+    def run(self, renderer, data, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            content = renderer.render(data, renderer.media_type, {})
+        return len(content), (time.perf_counter() - start) * 1000 / repeat
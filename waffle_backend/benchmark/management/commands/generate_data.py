@@ -0,0 +1,187 @@
+import datetime
+import random
+import time
+
+from django.contrib.admin.models import LogEntry
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from seminar import cache as seminar_cache
+from seminar.models import Seminar, SeminarSearchToken, UserSeminar
+from seminar.search import seminar_tokens
+from survey import stats as survey_stats
+from survey.management.commands.download_survey import OperatingSystemMap
+from survey.models import SurveyResult
+from user import authentication
+from user.models import InstructorProfile, ParticipantProfile
+
+WORDS = (
+    'django', 'python', 'backend', 'waffle', 'seminar', 'server', 'database', 'query', 'index', 'cache',
+    'design', 'rest', 'api', 'deploy', 'docker', 'mysql', 'testing', 'network', 'security', 'async',
+)
+MAJORS = ('컴퓨터공학부', '전기정보공학부', '수리과학부', '경영학과', '')
+GRADES = ('1학년', '2학년', '3학년', '4학년', '')
+
+
+class Command(BaseCommand):
+    help = "Generate synthetic users, profiles, seminars, memberships and surveys for benchmarks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--instructor-ratio', type=float, default=0.2)
+        parser.add_argument('--seminars', type=int, default=100)
+        parser.add_argument('--seminars-per-participant', type=int, default=3)
+        parser.add_argument('--surveys', type=int, default=5000)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='bench', help="Prefix of generated usernames and seminar names")
+        parser.add_argument('--clear', action='store_true', help="Delete data generated with the same prefix first")
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        self.prefix = options['prefix']
+        self.batch_size = options['batch_size']
+        if options['clear']:
+            self.clear()
+        elif User.objects.filter(username__startswith=self.prefix).exists():
+            raise CommandError("Data with prefix '{}' already exists, use --clear to replace it".format(self.prefix))
+
+        with transaction.atomic():
+            instructors, participants = self.timed('users', self.generate_users, options['users'],
+                                                   options['instructor_ratio'])
+            seminars = self.timed('seminars', self.generate_seminars, options['seminars'])
+            self.timed('memberships', self.generate_memberships, seminars, instructors, participants,
+                       options['seminars_per_participant'])
+            self.timed('surveys', self.generate_surveys, options['surveys'], participants)
+        # Bulk inserts skip the signals that normally keep these caches fresh.
+        seminar_cache.invalidate()
+        survey_stats.invalidate()
+
+    def timed(self, name, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        self.stdout.write("Generated {} in {:.1f}s".format(name, time.perf_counter() - start))
+        return result
+
+    def clear(self):
+        # Raw deletes send no signals, which would write a tombstone and invalidate the seminar, survey
+        # and token caches for every generated row. Related rows go first and the caches are reset once.
+        users = User.objects.filter(username__startswith=self.prefix)
+        seminars = Seminar.objects.filter(name__startswith=self.prefix)
+        keys = list(Token.objects.filter(user__in=users).values_list('key', flat=True))
+        with transaction.atomic():
+            SurveyResult.objects.filter(user__in=users).exclude(say_something=self.prefix).update(user=None)
+            for queryset in (
+                SurveyResult.objects.filter(say_something=self.prefix),
+                UserSeminar.objects.filter(Q(seminar__in=seminars) | Q(user__in=users)),
+                SeminarSearchToken.objects.filter(seminar__in=seminars),
+                seminars,
+                Token.objects.filter(user__in=users),
+                InstructorProfile.objects.filter(user__in=users),
+                ParticipantProfile.objects.filter(user__in=users),
+                LogEntry.objects.filter(user__in=users),
+                User.groups.through.objects.filter(user__in=users),
+                User.user_permissions.through.objects.filter(user__in=users),
+                users,
+            ):
+                queryset._raw_delete(queryset.db)
+        seminar_cache.invalidate()
+        survey_stats.invalidate()
+        authentication.invalidate(*keys)
+
+    def generate_users(self, count, instructor_ratio):
+        # Hashing is deliberately slow, so every generated user shares the hash of 'password'.
+        password = make_password('password')
+        User.objects.bulk_create([
+            User(
+                username='{}{:07d}'.format(self.prefix, i),
+                email='{}{:07d}@mail.com'.format(self.prefix, i),
+                password=password,
+                first_name='Waffle',
+                last_name='Rookie',
+            )
+            for i in range(count)
+        ], batch_size=self.batch_size)
+        ids = list(User.objects.filter(username__startswith=self.prefix).order_by('id').values_list('id', flat=True))
+        tokens = [Token(user_id=pk) for pk in ids]
+        for token in tokens:
+            token.key = token.generate_key()
+        Token.objects.bulk_create(tokens, batch_size=self.batch_size)
+
+        instructors = ids[:int(len(ids) * instructor_ratio)]
+        participants = ids[len(instructors):]
+        InstructorProfile.objects.bulk_create([
+            InstructorProfile(user_id=pk, company=random.choice(('Waffle', 'Toss', 'Kakao', '')),
+                              year=random.choice((None, 1, 3, 5)))
+            for pk in instructors
+        ], batch_size=self.batch_size)
+        ParticipantProfile.objects.bulk_create([
+            ParticipantProfile(user_id=pk, university=random.choice(('SNU', 'KAIST', '')), accepted=random.random() < 0.9)
+            for pk in participants
+        ], batch_size=self.batch_size)
+        return instructors, participants
+
+    def generate_seminars(self, count):
+        Seminar.objects.bulk_create([
+            Seminar(
+                name='{} {}'.format(self.prefix, ' '.join(random.sample(WORDS, 3))),
+                description=' '.join(random.sample(WORDS, 8)),
+                capacity=random.randint(20, 100),
+                count=random.randint(1, 10),
+                time=datetime.time(random.randint(9, 21), 0),
+                start_date=datetime.date.today() + datetime.timedelta(days=random.randint(0, 60)),
+                online=random.random() < 0.5,
+            )
+            for _ in range(count)
+        ], batch_size=self.batch_size)
+        seminars = list(Seminar.objects.filter(name__startswith=self.prefix).order_by('id'))
+        SeminarSearchToken.objects.bulk_create([
+            SeminarSearchToken(seminar_id=seminar.pk, field=field, token=token)
+            for seminar in seminars
+            for field, token in seminar_tokens(seminar.name, seminar.description)
+        ], batch_size=self.batch_size)
+        return seminars
+
+    def generate_memberships(self, seminars, instructors, participants, seminars_per_participant):
+        now = timezone.now()
+        memberships = []
+        # An instructor can only be in charge of a single seminar.
+        for seminar, pk in zip(seminars, instructors):
+            memberships.append(UserSeminar(user_id=pk, seminar=seminar, role=UserSeminar.INSTRUCTOR))
+            seminar.instructor_count = 1
+        for pk in participants:
+            for seminar in random.sample(seminars, min(seminars_per_participant, len(seminars))):
+                if seminar.active_participant_count >= seminar.capacity:
+                    continue
+                dropped_at = now if random.random() < 0.1 else None
+                memberships.append(UserSeminar(user_id=pk, seminar=seminar, role=UserSeminar.PARTICIPANT,
+                                               dropped_at=dropped_at))
+                if dropped_at is None:
+                    seminar.active_participant_count += 1
+        UserSeminar.objects.bulk_create(memberships, batch_size=self.batch_size)
+        Seminar.objects.bulk_update(seminars, ['active_participant_count', 'instructor_count'],
+                                    batch_size=self.batch_size)
+
+    def generate_surveys(self, count, participants):
+        operating_systems = OperatingSystemMap()
+        names = ('Windows', 'MacOS', 'Linux')
+        SurveyResult.objects.bulk_create([
+            SurveyResult(
+                user_id=random.choice(participants) if participants and random.random() < 0.5 else None,
+                os_id=operating_systems[random.choice(names)],
+                python=random.randint(1, 5),
+                rdb=random.randint(1, 5),
+                programming=random.randint(1, 5),
+                major=random.choice(MAJORS),
+                grade=random.choice(GRADES),
+                backend_reason=' '.join(random.sample(WORDS, 5)),
+                waffle_reason=' '.join(random.sample(WORDS, 5)),
+                say_something=self.prefix,
+            )
+            for _ in range(count)
+        ], batch_size=self.batch_size)
@@ -0,0 +1,87 @@
+from django.contrib.auth.models import User
+from django.db.models import Count, Q
+
+from seminar.models import Seminar, UserSeminar
+from survey.models import SurveyResult
+
+
+class Scenario(object):
+
+    def __init__(self, name, path, method='get', user=None, data=None, headers=None):
+        self.name = name
+        self.path = path
+        self.method = method
+        self.user = user
+        self.data = data
+        self.headers = headers or {}
+
+    def build(self, context):
+        # Returns the client method, path, body and extra headers for one request.
+        kwargs = dict(self.headers)
+        if self.user is not None:
+            kwargs['HTTP_AUTHORIZATION'] = 'Token {}'.format(context['tokens'][self.user])
+        data = self.data(context) if callable(self.data) else self.data
+        if data is not None:
+            kwargs['data'] = data
+            kwargs['content_type'] = 'application/json'
+        return self.method, self.path.format(**context), kwargs
+
+
+SCENARIOS = [
+    Scenario('seminar-list', '/api/v1/seminar/'),
+    Scenario('seminar-list-name', '/api/v1/seminar/?name={word}'),
+    Scenario('seminar-search', '/api/v1/seminar/?search={word}'),
+    Scenario('seminar-retrieve', '/api/v1/seminar/{seminar}/', user='participant'),
+    Scenario('seminar-batch', '/api/v1/seminar/?ids={seminar_ids}'),
+    Scenario('user-me', '/api/v1/user/me/', user='participant'),
+    Scenario('user-retrieve', '/api/v1/user/{instructor}/', user='participant'),
+    Scenario('user-batch', '/api/v1/user/?ids={user_ids}', user='participant'),
+    Scenario('user-login', '/api/v1/user/login/', method='put',
+             data=lambda context: {'username': context['username'], 'password': 'password'}),
+    Scenario('survey-list', '/api/v1/survey/'),
+    Scenario('survey-list-expand', '/api/v1/survey/?expand=user'),
+    Scenario('survey-retrieve', '/api/v1/survey/{survey}/?expand=user'),
+    Scenario('survey-stats', '/api/v1/survey/stats/'),
+    Scenario('os-list', '/api/v1/os/'),
+]
+
+
+def get_scenarios(names=None):
+    if not names:
+        return list(SCENARIOS)
+    scenarios = {scenario.name: scenario for scenario in SCENARIOS}
+    return [scenarios[name] for name in names]
+
+
+def build_context():
+    # Picks the busiest seminar and members with tokens so scenarios exercise realistic payloads.
+    seminar = Seminar.objects.order_by('-active_participant_count', 'id').first()
+    if seminar is None:
+        return None
+    participant = User.objects.filter(
+        participant__isnull=False, auth_token__isnull=False,
+    ).annotate(
+        seminars=Count('user_seminar', filter=Q(user_seminar__role=UserSeminar.PARTICIPANT)),
+    ).order_by('-seminars', 'id').first()
+    instructor = User.objects.filter(
+        instructor__isnull=False, user_seminar__role=UserSeminar.INSTRUCTOR,
+    ).order_by('id').first()
+    survey = SurveyResult.objects.filter(user__isnull=False).order_by('-id').first()
+    if participant is None or instructor is None or survey is None:
+        return None
+    # Logging in saves the user, which would invalidate the cached token of the participant.
+    username = User.objects.exclude(pk=participant.pk).order_by('-id').values_list('username', flat=True).first()
+    seminar_ids = Seminar.objects.order_by('-id').values_list('id', flat=True)[:20]
+    user_ids = User.objects.filter(user_seminar__isnull=False).distinct()\
+        .order_by('-id').values_list('id', flat=True)[:20]
+    return {
+        'seminar': seminar.pk,
+        'seminar_ids': ','.join(map(str, seminar_ids)),
+        'user_ids': ','.join(map(str, user_ids)),
+        'word': seminar.name.split()[-1],
+        'participant': participant.pk,
+        'instructor': instructor.pk,
+        'survey': survey.pk,
+        'username': username,
+        'tokens': {'participant': participant.auth_token.key},
+    }
@@ -0,0 +1,83 @@
+import io
+import json
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import AsyncClient, Client, TestCase
+from rest_framework.authtoken.models import Token
+
+from benchmark.scenarios import SCENARIOS
+from seminar.models import Seminar, Tombstone, UserSeminar
+
+
+class BenchmarkTestCase(TestCase):
+
+    def test_generate_data(self):
+        call_command('generate_data', '--users', '50', '--seminars', '5', '--surveys', '30', stdout=io.StringIO())
+        for seminar in Seminar.objects.all():
+            memberships = UserSeminar.objects.filter(seminar=seminar)
+            self.assertEqual(seminar.instructor_count, memberships.filter(role=UserSeminar.INSTRUCTOR).count())
+            self.assertEqual(
+                seminar.active_participant_count,
+                memberships.filter(role=UserSeminar.PARTICIPANT, dropped_at__isnull=True).count(),
+            )
+
+    def test_generate_data_clear(self):
+        args = ('generate_data', '--users', '50', '--seminars', '5', '--surveys', '30')
+        call_command(*args, stdout=io.StringIO())
+        token = Token.objects.filter(user__username__startswith='bench').first()
+        auth = {'HTTP_AUTHORIZATION': 'Token {}'.format(token.key)}
+        self.assertEqual(self.client.get('/api/v1/user/me/', **auth).status_code, 200)
+
+        call_command(*args, '--clear', '--seed', '1', stdout=io.StringIO())
+        self.assertEqual(User.objects.count(), 50)
+        self.assertEqual(Seminar.objects.count(), 5)
+        self.assertFalse(Tombstone.objects.exists())
+        self.assertEqual(self.client.get('/api/v1/user/me/', **auth).status_code, 401)
+
+    def test_benchmark(self):
+        call_command('generate_data', '--users', '50', '--seminars', '5', '--surveys', '30', stdout=io.StringIO())
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'results.json')
+            out = io.StringIO()
+            call_command('benchmark', '--repeat', '2', '--warmup', '0', '--output', path, stdout=out)
+            call_command('benchmark', '--repeat', '1', '--scenario', 'seminar-list', '--compare', path, stdout=out)
+            with open(path) as f:
+                report = json.load(f)
+        self.assertEqual(set(report['results']), {scenario.name for scenario in SCENARIOS})
+        for name, result in report['results'].items():
+            self.assertEqual(result['status'], [200], name)
+            self.assertLessEqual(result['p50'], result['p99'])
+        self.assertIn('Compared with', out.getvalue())
+
+    def test_benchmark_concurrency(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest("In-memory SQLite cannot serve concurrent writers")
+        call_command('generate_data', '--users', '50', '--seminars', '5', '--surveys', '30', stdout=io.StringIO())
+        out = io.StringIO()
+        call_command('benchmark_concurrency', '--scenario', 'os-list', '--requests', '4', '--concurrency', '2',
+                     stdout=out)
+        self.assertIn('os-list              wsgi        2', out.getvalue())
+        self.assertIn('os-list              asgi        2', out.getvalue())
+
+    def test_benchmark_concurrency_errors(self):
+        call_command('generate_data', '--users', '50', '--seminars', '5', '--surveys', '30', stdout=io.StringIO())
+        out, err = io.StringIO(), io.StringIO()
+        error = DatabaseError('database is gone')
+        with patch.object(Client, 'get', side_effect=error), patch.object(AsyncClient, 'get', side_effect=error):
+            call_command('benchmark_concurrency', '--scenario', 'os-list', '--requests', '4', '--concurrency', '2',
+                         stdout=out, stderr=err)
+        self.assertIn('os-list              wsgi        2       n/a       n/a       n/a       4', out.getvalue())
+        self.assertIn('os-list              asgi        2       n/a       n/a       n/a       4', out.getvalue())
+        self.assertIn("DatabaseError('database is gone')", err.getvalue())
+
+    def test_benchmark_renderers(self):
+        call_command('generate_data', '--users', '50', '--seminars', '5', '--surveys', '30', stdout=io.StringIO())
+        out = io.StringIO()
+        call_command('benchmark_renderers', '--repeat', '1', '--scenario', 'seminar-list', stdout=out)
+        self.assertIn('seminar-list', out.getvalue())
+        self.assertIn('fast', out.getvalue())
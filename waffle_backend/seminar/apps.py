@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class SeminarConfig(AppConfig):
     name = 'seminar'
+
+    def ready(self):
+        import seminar.signals  # noqa
@@ -0,0 +1,79 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+LIST_PARAMS = ('name', 'search', 'order', 'cursor', 'page_size', 'fields', 'omit')
+LIST_VERSION_KEY = 'seminar:list:version'
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[settings.SEMINAR_CACHE['ALIAS']]
+
+
+def detail_key(pk):
+    # Only canonical ids are cached so that invalidating by seminar.pk always finds the entry.
+    pk = str(pk)
+    if not pk.isdigit() or pk != str(int(pk)):
+        return None
+    return 'seminar:detail:{}'.format(pk)
+
+
+def list_key(request):
+    params = [request.get_host()] + [request.query_params.get(param, '') for param in LIST_PARAMS]
+    digest = hashlib.md5('\n'.join(params).encode('utf-8')).hexdigest()
+    return 'seminar:list:{}:{}'.format(get_list_version(), digest)
+
+
+def get_list_version():
+    cache = get_cache()
+    version = cache.get(LIST_VERSION_KEY)
+    if version is None:
+        # Start from the clock so that an evicted version never brings back old list entries.
+        cache.add(LIST_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(LIST_VERSION_KEY)
+    return version
+
+
+def get(key):
+    data = get_cache().get(key) if key else None
+    with _stats_lock:
+        _stats['hits' if data is not None else 'misses'] += 1
+    return data
+
+
+def set(key, data):
+    if key:
+        get_cache().set(key, data, settings.SEMINAR_CACHE['TIMEOUT'])
+
+
+def invalidate(*pks):
+    cache = get_cache()
+    cache.delete_many([detail_key(pk) for pk in pks])
+    try:
+        cache.incr(LIST_VERSION_KEY)
+    except ValueError:
+        pass
+
+
+def invalidate_on_commit(*pks):
+    # Invalidate now and again once the transaction commits, so that a read racing the
+    # transaction cannot leave stale data behind.
+    invalidate(*pks)
+    transaction.on_commit(lambda: invalidate(*pks))
+
+
+def stats():
+    with _stats_lock:
+        hits, misses = _stats['hits'], _stats['misses']
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+    }
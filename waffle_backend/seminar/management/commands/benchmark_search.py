@@ -0,0 +1,98 @@
+import datetime
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from seminar import cache as seminar_cache
+from seminar.models import Seminar, SeminarSearchToken
+from seminar.search import filter_seminars, search_seminars, seminar_tokens
+
+BENCHMARK_PREFIX = 'zzbench'
+SYLLABLES = (
+    'ka', 'ne', 'ro', 'mi', 'su', 'ta', 'po', 'li', 'de', 'ju', 'ba', 'ko', 'hi', 'sa', 'mo', 'ri', 'zu', 'ye',
+)
+
+
+class Command(BaseCommand):
+    help = "Compare name__contains scans against the seminar search index on synthetic seminars"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000000)
+        parser.add_argument('--vocabulary', type=int, default=5000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--keep', action='store_true', help="Keep the generated seminars")
+
+    def handle(self, *args, **options):
+        random.seed(0)
+        vocabulary = sorted({
+            ''.join(random.choice(SYLLABLES) for _ in range(random.randint(2, 5)))
+            for _ in range(options['vocabulary'])
+        })
+        self.generate(options['count'], options['batch_size'], vocabulary)
+        queries = random.sample(vocabulary, 3) + [word[:3] for word in random.sample(vocabulary, 3)]
+        queries.append(' '.join(random.sample(vocabulary, 2)))
+        try:
+            for query in queries:
+                scan = self.measure(
+                    lambda: list(Seminar.objects.filter(name__contains=query)
+                                 .order_by('-created_at', '-id').values_list('id', flat=True)[:20]),
+                    options['repeat'],
+                )
+                indexed = self.measure(
+                    lambda: list(filter_seminars(Seminar.objects.all(), query)
+                                 .order_by('-created_at', '-id').values_list('id', flat=True)[:20]),
+                    options['repeat'],
+                )
+                ranked = self.measure(
+                    lambda: search_seminars(Seminar.objects.all(), query, limit=20),
+                    options['repeat'],
+                )
+                self.stdout.write("{:<20} contains {:8.2f}ms  index {:8.2f}ms  ranked {:8.2f}ms".format(
+                    query, scan, indexed, ranked
+                ))
+        finally:
+            if not options['keep']:
+                self.clear()
+
+    def clear(self):
+        # Raw deletes send no signals, which would write a tombstone and invalidate the cache for every
+        # synthetic seminar. They have no members, only search tokens, which go first.
+        seminars = Seminar.objects.filter(name__startswith=BENCHMARK_PREFIX)
+        tokens = SeminarSearchToken.objects.filter(seminar__in=seminars)
+        tokens._raw_delete(tokens.db)
+        seminars._raw_delete(seminars.db)
+        seminar_cache.invalidate()
+
+    def generate(self, count, batch_size, vocabulary):
+        start = time.perf_counter()
+        for offset in range(0, count, batch_size):
+            with transaction.atomic():
+                last = Seminar.objects.order_by('-id').values_list('id', flat=True).first() or 0
+                Seminar.objects.bulk_create([
+                    Seminar(
+                        name='{} {}'.format(BENCHMARK_PREFIX, ' '.join(random.sample(vocabulary, 3))),
+                        description=' '.join(random.sample(vocabulary, 8)),
+                        capacity=random.randint(10, 100),
+                        count=random.randint(1, 10),
+                        time=datetime.time(random.randint(0, 23), 0),
+                        online=True,
+                    )
+                    for _ in range(min(batch_size, count - offset))
+                ])
+                seminars = Seminar.objects.filter(id__gt=last).values_list('id', 'name', 'description')
+                SeminarSearchToken.objects.bulk_create([
+                    SeminarSearchToken(seminar_id=pk, field=field, token=token)
+                    for pk, name, description in seminars
+                    for field, token in seminar_tokens(name, description)
+                ], batch_size=batch_size)
+        self.stdout.write("Generated {} seminars in {:.1f}s".format(count, time.perf_counter() - start))
+
+    def measure(self, func, repeat):
+        func()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - start) / repeat * 1000
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+
+from seminar import cache
+from seminar.models import Seminar, UserSeminar
+
+
+class Command(BaseCommand):
+    help = "Recount seminar participants and instructors and repair stored counters that drifted"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report drifted seminars")
+
+    def handle(self, *args, **options):
+        seminars = Seminar.objects.annotate(
+            actual_participants=Count(
+                'user_seminar',
+                filter=Q(user_seminar__role=UserSeminar.PARTICIPANT) & Q(user_seminar__dropped_at=None)
+            ),
+            actual_instructors=Count('user_seminar', filter=Q(user_seminar__role=UserSeminar.INSTRUCTOR)),
+        ).values_list('id', 'active_participant_count', 'actual_participants', 'instructor_count', 'actual_instructors')
+
+        drifted = 0
+        for pk, participants, actual_participants, instructors, actual_instructors in seminars.iterator():
+            if participants == actual_participants and instructors == actual_instructors:
+                continue
+            drifted += 1
+            self.stdout.write("Seminar {}: participants {} -> {}, instructors {} -> {}".format(
+                pk, participants, actual_participants, instructors, actual_instructors
+            ))
+            if not options['dry_run']:
+                self.repair(pk)
+
+        self.stdout.write("{} seminar(s) {}".format(drifted, 'drifted' if options['dry_run'] else 'repaired'))
+
+    @transaction.atomic
+    def repair(self, pk):
+        # Recount under the row lock so that concurrent joins and drops cannot slip in between.
+        Seminar.objects.select_for_update().filter(pk=pk).exists()
+        Seminar.objects.filter(pk=pk).update(
+            active_participant_count=UserSeminar.objects.filter(
+                seminar_id=pk, role=UserSeminar.PARTICIPANT, dropped_at=None
+            ).count(),
+            instructor_count=UserSeminar.objects.filter(seminar_id=pk, role=UserSeminar.INSTRUCTOR).count(),
+        )
+        cache.invalidate_on_commit(pk)
@@ -0,0 +1,32 @@
+# Generated by Django 3.1.14 on 2026-10-17 23:36
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def count_active_participants(apps, schema_editor):
+    Seminar = apps.get_model('seminar', 'Seminar')
+    seminars = Seminar.objects.annotate(
+        participants=Count(
+            'user_seminar',
+            filter=Q(user_seminar__role='participant') & Q(user_seminar__dropped_at=None)
+        )
+    )
+    for seminar in seminars:
+        Seminar.objects.filter(pk=seminar.pk).update(active_participant_count=seminar.participants)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seminar', '0009_auto_20200930_0229'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seminar',
+            name='active_participant_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(count_active_participants, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.14 on 2026-10-17 23:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seminar', '0010_seminar_active_participant_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='seminar',
+            index=models.Index(fields=['created_at', 'id'], name='seminar_sem_created_699768_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 3.1.14 on 2026-10-17 23:38
+
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Frozen copy of seminar.search.seminar_tokens as of this migration, so later changes to the
+# tokenizer do not change what this migration writes.
+TOKEN_LENGTH = 10
+NAME = 0
+DESCRIPTION = 1
+WORD = re.compile(r'\w+')
+
+
+def seminar_tokens(name, description):
+    tokens = set()
+    for field, text in ((NAME, name), (DESCRIPTION, description)):
+        for word in WORD.findall((text or '').lower()):
+            for i in range(1, min(len(word), TOKEN_LENGTH) + 1):
+                tokens.add((field, word[:i]))
+    return tokens
+
+
+def index_seminars(apps, schema_editor):
+    Seminar = apps.get_model('seminar', 'Seminar')
+    SeminarSearchToken = apps.get_model('seminar', 'SeminarSearchToken')
+    for seminar in Seminar.objects.iterator():
+        SeminarSearchToken.objects.bulk_create([
+            SeminarSearchToken(seminar=seminar, field=field, token=token)
+            for field, token in seminar_tokens(seminar.name, seminar.description)
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seminar', '0011_auto_20261018_0838'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeminarSearchToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.PositiveSmallIntegerField(choices=[(0, 'name'), (1, 'description')])),
+                ('token', models.CharField(max_length=10)),
+                ('seminar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='seminar.seminar')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='seminarsearchtoken',
+            index=models.Index(fields=['token', 'field', 'seminar'], name='seminar_sem_token_fd1202_idx'),
+        ),
+        migrations.RunPython(index_seminars, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 3.1.14 on 2026-10-17 23:46
+
+from django.db import migrations, models
+from django.db.models import Count
+
+ROLES = (('participant', 0), ('instructor', 1))
+
+
+def role_to_integer(apps, schema_editor):
+    # Every stored name must map to a role; rows with any other value stop the migration instead
+    # of silently becoming participants.
+    UserSeminar = apps.get_model('seminar', 'UserSeminar')
+    roles = dict(ROLES)
+    ids = {role: [] for role in roles.values()}
+    unknown = []
+    for pk, name in UserSeminar.objects.values_list('id', 'role_name'):
+        role = roles.get((name or '').strip().lower())
+        if role is None:
+            unknown.append((pk, name))
+        else:
+            ids[role].append(pk)
+    if unknown:
+        raise ValueError('UserSeminar rows with an unknown role, fix them before migrating: {}'.format(unknown[:20]))
+    for role, pks in ids.items():
+        UserSeminar.objects.filter(id__in=pks).update(role=role)
+
+
+def role_to_name(apps, schema_editor):
+    UserSeminar = apps.get_model('seminar', 'UserSeminar')
+    for name, role in ROLES:
+        UserSeminar.objects.filter(role=role).update(role_name=name)
+
+
+def remove_duplicate_memberships(apps, schema_editor):
+    # Attending used to read then insert, so concurrent requests could add the same membership twice.
+    # The earliest row is kept and the seminar's participant counter is recomputed.
+    Seminar = apps.get_model('seminar', 'Seminar')
+    UserSeminar = apps.get_model('seminar', 'UserSeminar')
+    duplicates = UserSeminar.objects.order_by().values('user', 'seminar')\
+        .annotate(memberships=Count('id')).filter(memberships__gt=1)
+    seminars = set()
+    for row in duplicates:
+        ids = list(
+            UserSeminar.objects.filter(user_id=row['user'], seminar_id=row['seminar'])
+            .order_by('created_at', 'id').values_list('id', flat=True)
+        )
+        UserSeminar.objects.filter(id__in=ids[1:]).delete()
+        seminars.add(row['seminar'])
+    for pk in seminars:
+        Seminar.objects.filter(pk=pk).update(active_participant_count=UserSeminar.objects.filter(
+            seminar_id=pk, role=0, dropped_at=None,
+        ).count())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seminar', '0012_seminarsearchtoken'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='userseminar',
+            old_name='role',
+            new_name='role_name',
+        ),
+        migrations.AddField(
+            model_name='userseminar',
+            name='role',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'participant'), (1, 'instructor')], default=0),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='userseminar',
+            name='role_name',
+            field=models.CharField(max_length=20, null=True),
+        ),
+        migrations.RunPython(role_to_integer, role_to_name),
+        migrations.RemoveField(
+            model_name='userseminar',
+            name='role_name',
+        ),
+        migrations.AddIndex(
+            model_name='userseminar',
+            index=models.Index(fields=['seminar', 'role', 'dropped_at'], name='userseminar_seminar_role_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userseminar',
+            index=models.Index(fields=['user', 'role'], name='userseminar_user_role_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_memberships, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='userseminar',
+            constraint=models.UniqueConstraint(fields=('user', 'seminar'), name='unique_user_seminar'),
+        ),
+    ]
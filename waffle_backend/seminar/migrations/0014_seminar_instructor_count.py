@@ -0,0 +1,27 @@
+# Generated by Django 3.1.14 on 2026-10-17 23:52
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def count_instructors(apps, schema_editor):
+    Seminar = apps.get_model('seminar', 'Seminar')
+    seminars = Seminar.objects.annotate(instructors=Count('user_seminar', filter=Q(user_seminar__role=1)))
+    for seminar in seminars:
+        Seminar.objects.filter(pk=seminar.pk).update(instructor_count=seminar.instructors)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seminar', '0013_userseminar_role_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seminar',
+            name='instructor_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(count_instructors, migrations.RunPython.noop),
+    ]
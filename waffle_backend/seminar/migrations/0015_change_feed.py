@@ -0,0 +1,39 @@
+# Generated by Django 3.1.14 on 2026-10-18 00:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seminar', '0014_seminar_instructor_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.PositiveSmallIntegerField(choices=[(0, 'seminar'), (1, 'userseminar')])),
+                ('object_id', models.PositiveIntegerField()),
+                ('owner_id', models.PositiveIntegerField(null=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='seminar',
+            index=models.Index(fields=['updated_at', 'id'], name='seminar_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userseminar',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='userseminar_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['kind', 'deleted_at'], name='tombstone_kind_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['owner_id', 'kind', 'deleted_at'], name='tombstone_owner_idx'),
+        ),
+    ]
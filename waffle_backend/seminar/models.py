@@ -7,18 +7,71 @@ class Seminar(models.Model):
     description = models.CharField(max_length=200, blank=True)
     capacity = models.PositiveSmallIntegerField()
     count = models.PositiveSmallIntegerField()
+    active_participant_count = models.PositiveSmallIntegerField(default=0)
+    instructor_count = models.PositiveSmallIntegerField(default=0)
     time = models.TimeField()
     start_date = models.DateField(null=True)
     online = models.BooleanField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['updated_at', 'id'], name='seminar_updated_idx'),
+        ]
+
 
 class UserSeminar(models.Model):
-    AVAILABLE_ROLES = ((0, 'participant'), (1, 'instructor'))
+    PARTICIPANT = 0
+    INSTRUCTOR = 1
+    AVAILABLE_ROLES = ((PARTICIPANT, 'participant'), (INSTRUCTOR, 'instructor'))
+    ROLES = {name: role for role, name in AVAILABLE_ROLES}
     user = models.ForeignKey(User, related_name='user_seminar', on_delete=models.CASCADE)
     seminar = models.ForeignKey(Seminar, related_name='user_seminar', on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    role = models.CharField(max_length=20)
+    role = models.PositiveSmallIntegerField(choices=AVAILABLE_ROLES)
     dropped_at = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['seminar', 'role', 'dropped_at'], name='userseminar_seminar_role_idx'),
+            models.Index(fields=['user', 'role'], name='userseminar_user_role_idx'),
+            models.Index(fields=['user', 'updated_at', 'id'], name='userseminar_user_updated_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'seminar'], name='unique_user_seminar'),
+        ]
+
+
+class SeminarSearchToken(models.Model):
+    NAME = 0
+    DESCRIPTION = 1
+    FIELDS = ((NAME, 'name'), (DESCRIPTION, 'description'))
+    seminar = models.ForeignKey(Seminar, related_name='search_tokens', on_delete=models.CASCADE)
+    field = models.PositiveSmallIntegerField(choices=FIELDS)
+    token = models.CharField(max_length=10)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['token', 'field', 'seminar']),
+        ]
+
+
+class Tombstone(models.Model):
+    # Records deletions for the change feeds. Seminar tombstones hold the seminar id; enrollment
+    # tombstones hold the seminar id too, with the enrolled user as owner.
+    SEMINAR = 0
+    USERSEMINAR = 1
+    KINDS = ((SEMINAR, 'seminar'), (USERSEMINAR, 'userseminar'))
+    kind = models.PositiveSmallIntegerField(choices=KINDS)
+    object_id = models.PositiveIntegerField()
+    owner_id = models.PositiveIntegerField(null=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'deleted_at'], name='tombstone_kind_idx'),
+            models.Index(fields=['owner_id', 'kind', 'deleted_at'], name='tombstone_owner_idx'),
+        ]
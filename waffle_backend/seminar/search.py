@@ -0,0 +1,97 @@
+import re
+
+from django.db.models import Case, Count, IntegerField, Q, Sum, When
+
+from seminar.models import SeminarSearchToken
+
+TOKEN_LENGTH = 10
+MAX_TERMS = 5
+WEIGHTS = {
+    SeminarSearchToken.NAME: 2,
+    SeminarSearchToken.DESCRIPTION: 1,
+}
+WORD = re.compile(r'\w+')
+
+
+def words(text):
+    return WORD.findall(text.lower())
+
+
+def seminar_tokens(name, description):
+    # Every prefix of every word is stored, so a query word matches the seminar as soon as it is
+    # a prefix of one of its words.
+    tokens = set()
+    for field, text in ((SeminarSearchToken.NAME, name), (SeminarSearchToken.DESCRIPTION, description)):
+        for word in words(text or ''):
+            for i in range(1, min(len(word), TOKEN_LENGTH) + 1):
+                tokens.add((field, word[:i]))
+    return tokens
+
+
+def index_seminar(seminar):
+    SeminarSearchToken.objects.filter(seminar=seminar).delete()
+    SeminarSearchToken.objects.bulk_create([
+        SeminarSearchToken(seminar=seminar, field=field, token=token)
+        for field, token in seminar_tokens(seminar.name, seminar.description)
+    ])
+
+
+def query_terms(query):
+    return list(dict.fromkeys(words(query)))[:MAX_TERMS]
+
+
+def matches(terms, fields):
+    tokens = {term[:TOKEN_LENGTH] for term in terms}
+    return SeminarSearchToken.objects\
+        .filter(token__in=tokens, field__in=fields)\
+        .values('seminar')\
+        .annotate(
+            terms=Count('token', distinct=True),
+            rank=Sum(
+                Case(
+                    *[When(field=field, then=weight) for field, weight in WEIGHTS.items()],
+                    output_field=IntegerField()
+                )
+            ),
+        )\
+        .filter(terms=len(tokens))
+
+
+def verify(queryset, terms, fields):
+    # Tokens are truncated, so terms longer than TOKEN_LENGTH are re-checked on the matched rows.
+    for term in terms:
+        if len(term) > TOKEN_LENGTH:
+            condition = Q()
+            if SeminarSearchToken.NAME in fields:
+                condition |= Q(name__icontains=term)
+            if SeminarSearchToken.DESCRIPTION in fields:
+                condition |= Q(description__icontains=term)
+            queryset = queryset.filter(condition)
+    return queryset
+
+
+def filter_seminars(queryset, query, fields=(SeminarSearchToken.NAME, )):
+    # Matches seminars having a word that starts with each query word ('waf' finds "waffle"). Unlike
+    # the former name__contains filter, words are not matched in the middle ('ffle' does not), which
+    # is what lets the token index serve it. A query without any word matches nothing.
+    # One semi-join per term keeps the filter free of GROUP BY, so the outer ordering index can
+    # still drive the scan and stop after the first page.
+    terms = query_terms(query)
+    if not terms:
+        return queryset.none() if query else queryset
+    for term in terms:
+        tokens = SeminarSearchToken.objects.filter(token=term[:TOKEN_LENGTH], field__in=fields)
+        queryset = queryset.filter(id__in=tokens.values('seminar'))
+    return verify(queryset, terms, fields)
+
+
+def search_seminars(queryset, query, limit, fields=(SeminarSearchToken.NAME, SeminarSearchToken.DESCRIPTION)):
+    terms = query_terms(query)
+    if not terms:
+        return []
+    ranks = matches(terms, fields).order_by('-rank', '-seminar')
+    if any(len(term) > TOKEN_LENGTH for term in terms):
+        ranks = ranks.filter(seminar__in=verify(queryset.model.objects.all(), terms, fields).values('id'))
+    ranks = {row['seminar']: (row['rank'], row['seminar']) for row in ranks[:limit]}
+    seminars = queryset.filter(id__in=ranks.keys())
+    return sorted(seminars, key=lambda seminar: ranks[seminar.id], reverse=True)
@@ -1,8 +1,9 @@
 from rest_framework import serializers
 from seminar.models import Seminar, UserSeminar
+from waffle_backend.sparse import SparseFieldsMixin
 
 
-class SeminarSerializer(serializers.ModelSerializer):
+class SeminarSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     description = serializers.CharField(allow_blank=True, required=False)
     time = serializers.TimeField(format='%H:%M', input_formats=['%H:%M',])
     instructors = serializers.SerializerMethodField()
@@ -25,17 +26,23 @@ class SeminarSerializer(serializers.ModelSerializer):
         )
 
     def get_instructors(self, seminar):
-        queryset = UserSeminar.objects.filter(seminar=seminar, role='instructor')
+        if hasattr(seminar, 'userseminar_instructors'):
+            queryset = seminar.userseminar_instructors
+        else:
+            queryset = UserSeminar.objects.filter(seminar=seminar, role=UserSeminar.INSTRUCTOR).select_related('user')
         return SeminarInstructorSerializer(queryset, many=True).data
 
     def get_participants(self, seminar):
-        queryset = UserSeminar.objects.filter(seminar=seminar, role='participant')
+        if hasattr(seminar, 'userseminar_participants'):
+            queryset = seminar.userseminar_participants
+        else:
+            queryset = UserSeminar.objects.filter(seminar=seminar, role=UserSeminar.PARTICIPANT).select_related('user')
         return SeminarParticipantSerializer(queryset, many=True).data
 
 
-class SimpleSeminarSerializer(serializers.ModelSerializer):
+class SimpleSeminarSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     instructors = serializers.SerializerMethodField()
-    participant_count = serializers.SerializerMethodField()
+    participant_count = serializers.IntegerField(source='active_participant_count', read_only=True)
 
     class Meta:
         model = Seminar
@@ -50,9 +57,6 @@ class SimpleSeminarSerializer(serializers.ModelSerializer):
     def get_instructors(self, seminar):
         return SeminarInstructorSerializer(seminar.userseminar_instructors, many=True).data
 
-    def get_participant_count(self, seminar):
-        return seminar.participant_count
-
 
 class ParticipantSeminarSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(source='seminar.id')
@@ -74,6 +78,16 @@ class ParticipantSeminarSerializer(serializers.ModelSerializer):
         return userseminar.dropped_at == None
 
 
+class EnrollmentSerializer(ParticipantSeminarSerializer):
+    role = serializers.CharField(source='get_role_display')
+
+    class Meta(ParticipantSeminarSerializer.Meta):
+        fields = ParticipantSeminarSerializer.Meta.fields + (
+            'role',
+            'updated_at',
+        )
+
+
 class InstructorSeminarSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(source='seminar.id')
     name = serializers.CharField(source='seminar.name')
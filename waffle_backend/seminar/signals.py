@@ -0,0 +1,67 @@
+import threading
+
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from seminar import cache
+from seminar.models import Seminar, Tombstone, UserSeminar
+from seminar.search import index_seminar
+
+# Seminars being deleted by this thread, whose cascaded member deletions need not touch them.
+_deleting = threading.local()
+
+
+@receiver(post_save, sender=Seminar)
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not {'name', 'description'} & set(update_fields):
+        return
+    index_seminar(instance)
+
+
+@receiver(post_save, sender=Seminar)
+@receiver(post_delete, sender=Seminar)
+def invalidate_seminar(sender, instance, **kwargs):
+    cache.invalidate_on_commit(instance.pk)
+
+
+@receiver(pre_delete, sender=Seminar)
+def start_seminar_deletion(sender, instance, **kwargs):
+    if not hasattr(_deleting, 'pks'):
+        _deleting.pks = set()
+    _deleting.pks.add(instance.pk)
+
+
+@receiver(post_save, sender=UserSeminar)
+@receiver(post_delete, sender=UserSeminar)
+def invalidate_userseminar(sender, instance, raw=False, **kwargs):
+    # The seminar's member list changed, which its validators and change feed rely on updated_at for.
+    # The views touch the seminar with its counters and mark the membership as `seminar_touched`;
+    # other writes, e.g. from the admin, are touched here.
+    touched = raw or getattr(instance, 'seminar_touched', False)
+    if not touched and instance.seminar_id not in getattr(_deleting, 'pks', ()):
+        Seminar.objects.filter(pk=instance.seminar_id).update(updated_at=timezone.now())
+    cache.invalidate_on_commit(instance.seminar_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user(sender, instance, created, update_fields=None, **kwargs):
+    # Seminar payloads embed member names and emails, but not login bookkeeping.
+    if created or (update_fields and set(update_fields) <= {'last_login', 'password'}):
+        return
+    pks = list(UserSeminar.objects.filter(user=instance).values_list('seminar_id', flat=True))
+    if pks:
+        Seminar.objects.filter(pk__in=pks).update(updated_at=timezone.now())
+        cache.invalidate_on_commit(*pks)
+
+
+@receiver(post_delete, sender=Seminar)
+def record_seminar_deletion(sender, instance, **kwargs):
+    getattr(_deleting, 'pks', set()).discard(instance.pk)
+    Tombstone.objects.create(kind=Tombstone.SEMINAR, object_id=instance.pk)
+
+
+@receiver(post_delete, sender=UserSeminar)
+def record_userseminar_deletion(sender, instance, **kwargs):
+    Tombstone.objects.create(kind=Tombstone.USERSEMINAR, object_id=instance.seminar_id, owner_id=instance.user_id)
@@ -1,3 +1,613 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import io
+import json
+import threading
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, Q
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from seminar import cache as seminar_cache
+from seminar.models import Seminar, SeminarSearchToken, Tombstone, UserSeminar
+from seminar.views import SeminarViewSet
+from user.models import InstructorProfile, ParticipantProfile
+from waffle_backend.asyncviews import AsyncReadRouter
+
+
+class SeminarTestMixin(object):
+
+    def setUp(self):
+        seminar_cache.get_cache().clear()
+
+    def create_user(self, username, role='participant', accepted=True):
+        user = User.objects.create_user(username=username, email='{}@mail.com'.format(username), password='password')
+        Token.objects.create(user=user)
+        if role == 'participant':
+            ParticipantProfile.objects.create(user=user, accepted=accepted)
+        else:
+            InstructorProfile.objects.create(user=user)
+        return user
+
+    def create_seminar(self, instructor, capacity=10, name='waffle'):
+        seminar = Seminar.objects.create(
+            name=name,
+            capacity=capacity,
+            count=5,
+            time=datetime.time(14, 0),
+            online=True,
+            instructor_count=1,
+        )
+        UserSeminar.objects.create(user=instructor, seminar=seminar, role=UserSeminar.INSTRUCTOR)
+        return seminar
+
+    def auth(self, user):
+        return {'HTTP_AUTHORIZATION': 'Token {}'.format(user.auth_token.key)}
+
+
+class GetSeminarTestCase(SeminarTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.instructor = self.create_user('instructor', role='instructor')
+        self.seminar = self.create_seminar(self.instructor, capacity=300)
+        User.objects.bulk_create([
+            User(username='participant{}'.format(i), email='participant{}@mail.com'.format(i))
+            for i in range(200)
+        ])
+        users = User.objects.filter(username__startswith='participant')
+        UserSeminar.objects.bulk_create([
+            UserSeminar(user=user, seminar=self.seminar, role=UserSeminar.PARTICIPANT) for user in users
+        ])
+        Seminar.objects.filter(pk=self.seminar.pk).update(active_participant_count=200)
+
+    def test_get_seminar_num_queries(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/v1/seminar/{}/'.format(self.seminar.id))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(len(data['instructors']), 1)
+        self.assertEqual(data['instructors'][0]['username'], 'instructor')
+        self.assertEqual(len(data['participants']), 200)
+
+    def test_attend_seminar_response(self):
+        participant = self.create_user('newcomer')
+        response = self.client.post(
+            '/api/v1/seminar/{}/user/'.format(self.seminar.id),
+            {'role': 'participant'},
+            **self.auth(participant)
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        data = response.json()
+        self.assertEqual(len(data['participants']), 201)
+        self.assertEqual(data['participants'][-1]['username'], 'newcomer')
+
+        response = self.client.delete('/api/v1/seminar/{}/user/'.format(self.seminar.id), **self.auth(participant))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.json()['participants'][-1]['is_active'])
+
+    def test_attend_seminar_invalid_role(self):
+        participant = self.create_user('newcomer')
+        for role in ('mentor', [], {'name': 'participant'}):
+            response = self.client.post(
+                '/api/v1/seminar/{}/user/'.format(self.seminar.id),
+                json.dumps({'role': role}),
+                content_type='application/json',
+                **self.auth(participant)
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class DropSeminarTestCase(SeminarTestMixin, TestCase):
+
+    def test_drop_seminar_once(self):
+        instructor = self.create_user('instructor', role='instructor')
+        seminar = self.create_seminar(instructor)
+        participant = self.create_user('participant')
+        for user in (participant, self.create_user('other')):
+            self.client.post('/api/v1/seminar/{}/user/'.format(seminar.id), {'role': 'participant'}, **self.auth(user))
+        stale = UserSeminar.objects.get(user=participant, seminar=seminar)
+        response = self.client.delete('/api/v1/seminar/{}/user/'.format(seminar.id), **self.auth(participant))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Seminar.objects.get(pk=seminar.pk).active_participant_count, 1)
+
+        # A concurrent drop that read the membership before it was dropped must not release a seat again.
+        with patch('seminar.views.SeminarViewSet.get_userseminar', return_value=stale):
+            response = self.client.delete('/api/v1/seminar/{}/user/'.format(seminar.id), **self.auth(participant))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(Seminar.objects.get(pk=seminar.pk).active_participant_count, 1)
+
+
+class AttendSeminarConcurrencyTestCase(SeminarTestMixin, TransactionTestCase):
+
+    def test_attend_seminar_concurrently(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest("In-memory SQLite cannot serve concurrent writers")
+        capacity = 5
+        instructor = self.create_user('instructor', role='instructor')
+        seminar = self.create_seminar(instructor, capacity=capacity)
+        participants = [self.create_user('participant{}'.format(i)) for i in range(20)]
+
+        barrier = threading.Barrier(len(participants))
+        status_codes = []
+
+        def attend(participant):
+            try:
+                barrier.wait()
+                response = self.client_class().post(
+                    '/api/v1/seminar/{}/user/'.format(seminar.id),
+                    {'role': 'participant'},
+                    **self.auth(participant)
+                )
+                status_codes.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attend, args=(participant, )) for participant in participants]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(status_codes.count(status.HTTP_201_CREATED), capacity)
+        self.assertEqual(status_codes.count(status.HTTP_400_BAD_REQUEST), len(participants) - capacity)
+        seminar.refresh_from_db()
+        self.assertEqual(seminar.active_participant_count, capacity)
+        self.assertEqual(UserSeminar.objects.filter(seminar=seminar, role=UserSeminar.PARTICIPANT).count(), capacity)
+
+
+class ListSeminarTestCase(SeminarTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.seminars = []
+        for i in range(5):
+            instructor = self.create_user('instructor{}'.format(i), role='instructor')
+            self.seminars.append(self.create_seminar(instructor, name='seminar{}'.format(i)))
+        created_at = self.seminars[0].created_at
+        Seminar.objects.filter(pk__in=[seminar.pk for seminar in self.seminars[1:4]]).update(created_at=created_at)
+
+    def get_all_pages(self, url):
+        names = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            data = response.json()
+            self.assertLessEqual(len(data['results']), 2)
+            names += [seminar['name'] for seminar in data['results']]
+            url = data['next']
+        return names
+
+    def test_list_seminar_pages(self):
+        names = self.get_all_pages('/api/v1/seminar/?page_size=2')
+        self.assertEqual(names, ['seminar4', 'seminar3', 'seminar2', 'seminar1', 'seminar0'])
+
+        names = self.get_all_pages('/api/v1/seminar/?page_size=2&order=earliest')
+        self.assertEqual(names, ['seminar0', 'seminar1', 'seminar2', 'seminar3', 'seminar4'])
+
+    def test_list_seminar_invalid_cursor(self):
+        response = self.client.get('/api/v1/seminar/?cursor=invalid')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SearchSeminarTestCase(SeminarTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        instructor = self.create_user('instructor0', role='instructor')
+        self.django = self.create_seminar(instructor, name='Django backend')
+        self.django.description = 'REST API with python'
+        self.django.save()
+        instructor = self.create_user('instructor1', role='instructor')
+        self.python = self.create_seminar(instructor, name='Python basics')
+        instructor = self.create_user('instructor2', role='instructor')
+        self.react = self.create_seminar(instructor, name='React frontend')
+
+    def test_filter_seminar_name_prefix(self):
+        response = self.client.get('/api/v1/seminar/?name=dja')
+        self.assertEqual([seminar['name'] for seminar in response.json()['results']], ['Django backend'])
+
+        response = self.client.get('/api/v1/seminar/?name=back dja')
+        self.assertEqual([seminar['name'] for seminar in response.json()['results']], ['Django backend'])
+
+        response = self.client.get('/api/v1/seminar/?name=end')
+        self.assertEqual(response.json()['results'], [])
+
+        response = self.client.get('/api/v1/seminar/?name=-')
+        self.assertEqual(response.json()['results'], [])
+
+    def test_search_seminar_ranked(self):
+        response = self.client.get('/api/v1/seminar/?search=pyth')
+        self.assertEqual(
+            [seminar['name'] for seminar in response.json()['results']],
+            ['Python basics', 'Django backend']
+        )
+
+    def test_search_index_follows_updates(self):
+        self.react.name = 'Vue frontend'
+        self.react.save()
+        response = self.client.get('/api/v1/seminar/?name=react')
+        self.assertEqual(response.json()['results'], [])
+        response = self.client.get('/api/v1/seminar/?name=vue')
+        self.assertEqual([seminar['name'] for seminar in response.json()['results']], ['Vue frontend'])
+
+    def test_benchmark_search_cleans_up_quietly(self):
+        call_command('benchmark_search', '--count', '50', '--vocabulary', '20', '--repeat', '1', stdout=io.StringIO())
+        self.assertEqual(Seminar.objects.count(), 3)
+        self.assertEqual(SeminarSearchToken.objects.exclude(seminar__in=Seminar.objects.all()).count(), 0)
+        self.assertFalse(Tombstone.objects.exists())
+
+
+class UserSeminarIndexTestCase(SeminarTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.instructor = self.create_user('instructor', role='instructor')
+        self.participant = self.create_user('participant')
+        self.seminar = self.create_seminar(self.instructor)
+        UserSeminar.objects.create(user=self.participant, seminar=self.seminar, role=UserSeminar.PARTICIPANT)
+
+    def assertUsesIndex(self, queryset, index):
+        self.assertIn(index, queryset.explain())
+
+    def test_seminar_member_queries_use_index(self):
+        self.assertUsesIndex(
+            UserSeminar.objects.filter(seminar__in=[self.seminar], role=UserSeminar.INSTRUCTOR),
+            'userseminar_seminar_role_idx'
+        )
+        self.assertUsesIndex(
+            UserSeminar.objects.filter(seminar=self.seminar, role=UserSeminar.PARTICIPANT, dropped_at=None),
+            'userseminar_seminar_role_idx'
+        )
+        self.assertUsesIndex(
+            Seminar.objects.annotate(participant_count=Count(
+                'user_seminar',
+                filter=Q(user_seminar__role=UserSeminar.PARTICIPANT) & Q(user_seminar__dropped_at=None)
+            )),
+            'userseminar_seminar_role_idx'
+        )
+
+    def test_user_role_queries_use_index(self):
+        self.assertUsesIndex(
+            UserSeminar.objects.filter(user=self.instructor, role=UserSeminar.INSTRUCTOR),
+            'userseminar_user_role_idx'
+        )
+        self.assertUsesIndex(
+            UserSeminar.objects.filter(user=self.participant, role=UserSeminar.PARTICIPANT),
+            'userseminar_user_role_idx'
+        )
+
+    def test_user_seminar_unique(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            UserSeminar.objects.create(user=self.participant, seminar=self.seminar, role=UserSeminar.PARTICIPANT)
+
+
+class SeminarCounterTestCase(SeminarTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.instructor = self.create_user('instructor', role='instructor')
+        self.seminar = self.create_seminar(self.instructor)
+        self.participants = [self.create_user('participant{}'.format(i)) for i in range(3)]
+        for participant in self.participants:
+            self.client.post(
+                '/api/v1/seminar/{}/user/'.format(self.seminar.id),
+                {'role': 'participant'},
+                **self.auth(participant)
+            )
+        self.client.delete('/api/v1/seminar/{}/user/'.format(self.seminar.id), **self.auth(self.participants[0]))
+
+    def test_list_seminar_participant_count(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/v1/seminar/')
+        self.assertEqual(response.json()['results'][0]['participant_count'], 2)
+        self.seminar.refresh_from_db()
+        self.assertEqual(self.seminar.active_participant_count, 2)
+        self.assertEqual(self.seminar.instructor_count, 1)
+
+    def test_reconcile_seminar_counts(self):
+        Seminar.objects.filter(pk=self.seminar.pk).update(active_participant_count=7, instructor_count=0)
+        out = io.StringIO()
+        call_command('reconcile_seminar_counts', '--dry-run', stdout=out)
+        self.assertIn('1 seminar(s) drifted', out.getvalue())
+        self.seminar.refresh_from_db()
+        self.assertEqual(self.seminar.active_participant_count, 7)
+
+        call_command('reconcile_seminar_counts', stdout=out)
+        self.seminar.refresh_from_db()
+        self.assertEqual(self.seminar.active_participant_count, 2)
+        self.assertEqual(self.seminar.instructor_count, 1)
+
+
+class SeminarCacheTestCase(SeminarTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.instructor = self.create_user('instructor', role='instructor')
+        self.seminar = self.create_seminar(self.instructor)
+        self.participant = self.create_user('participant')
+
+    def test_retrieve_seminar_cached(self):
+        url = '/api/v1/seminar/{}/'.format(self.seminar.id)
+        hits = seminar_cache.stats()['hits']
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            cached = self.client.get(url)
+        self.assertEqual(cached.json(), response.json())
+        self.assertEqual(seminar_cache.stats()['hits'], hits + 1)
+
+        self.client.post(
+            '/api/v1/seminar/{}/user/'.format(self.seminar.id),
+            {'role': 'participant'},
+            **self.auth(self.participant)
+        )
+        response = self.client.get(url)
+        self.assertEqual(len(response.json()['participants']), 1)
+
+    def test_list_seminar_cached(self):
+        response = self.client.get('/api/v1/seminar/?order=earliest')
+        with self.assertNumQueries(0):
+            self.client.get('/api/v1/seminar/?order=earliest')
+        self.assertEqual(response.json()['results'][0]['participant_count'], 0)
+
+        self.client.post(
+            '/api/v1/seminar/{}/user/'.format(self.seminar.id),
+            {'role': 'participant'},
+            **self.auth(self.participant)
+        )
+        response = self.client.get('/api/v1/seminar/?order=earliest')
+        self.assertEqual(response.json()['results'][0]['participant_count'], 1)
+
+    def test_user_update_invalidates_seminar(self):
+        url = '/api/v1/seminar/{}/'.format(self.seminar.id)
+        self.client.get(url)
+        self.instructor.email = 'changed@mail.com'
+        self.instructor.save()
+        response = self.client.get(url)
+        self.assertEqual(response.json()['instructors'][0]['email'], 'changed@mail.com')
+
+
+class SeminarConditionalTestCase(SeminarTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.instructor = self.create_user('instructor', role='instructor')
+        self.seminar = self.create_seminar(self.instructor)
+        self.participant = self.create_user('participant')
+
+    def test_retrieve_seminar_not_modified(self):
+        url = '/api/v1/seminar/{}/'.format(self.seminar.id)
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        seminar_cache.get_cache().clear()
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.post(
+            '/api/v1/seminar/{}/user/'.format(self.seminar.id),
+            {'role': 'participant'},
+            **self.auth(self.participant)
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_seminar_not_modified(self):
+        response = self.client.get('/api/v1/seminar/')
+        etag = response['ETag']
+
+        seminar_cache.get_cache().clear()
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/seminar/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get('/api/v1/seminar/?order=earliest', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class SeminarSparseFieldsTestCase(SeminarTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.instructor = self.create_user('instructor', role='instructor')
+        self.seminar = self.create_seminar(self.instructor)
+
+    def test_retrieve_seminar_fields(self):
+        url = '/api/v1/seminar/{}/'.format(self.seminar.id)
+        with self.assertNumQueries(1):
+            response = self.client.get(url + '?fields=id,name')
+        self.assertEqual(response.json(), {'id': self.seminar.id, 'name': 'waffle'})
+        with self.assertNumQueries(2):
+            response = self.client.get(url + '?omit=participants')
+        self.assertNotIn('participants', response.json())
+        self.assertEqual(len(response.json()['instructors']), 1)
+
+        full = self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url + '?fields=name', HTTP_IF_NONE_MATCH=full['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'name': 'waffle'})
+        self.assertNotEqual(response['ETag'], full['ETag'])
+
+    def test_list_seminar_fields(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/v1/seminar/?fields=id,name')
+        self.assertEqual(response.json()['results'], [{'id': self.seminar.id, 'name': 'waffle'}])
+        response = self.client.get('/api/v1/seminar/')
+        self.assertIn('instructors', response.json()['results'][0])
+
+
+class BatchSeminarTestCase(SeminarTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.seminars = []
+        for i in range(3):
+            instructor = self.create_user('instructor{}'.format(i), role='instructor')
+            self.seminars.append(self.create_seminar(instructor, name='seminar{}'.format(i)))
+        self.participant = self.create_user('participant')
+        UserSeminar.objects.create(user=self.participant, seminar=self.seminars[1], role=UserSeminar.PARTICIPANT)
+
+    def test_batch_seminar(self):
+        ids = [self.seminars[2].id, 0, self.seminars[1].id, self.seminars[0].id]
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/v1/seminar/?ids={}'.format(','.join(map(str, ids))))
+        data = response.json()
+        self.assertEqual([seminar['name'] for seminar in data['results']], ['seminar2', 'seminar1', 'seminar0'])
+        self.assertEqual(data['missing'], [0])
+        self.assertEqual(data['results'][1]['participants'][0]['username'], 'participant')
+
+        with self.assertNumQueries(3):
+            self.client.get('/api/v1/seminar/?ids={}'.format(self.seminars[0].id))
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/seminar/?ids={}&fields=id,name'.format(self.seminars[0].id))
+        self.assertEqual(response.json()['results'], [{'id': self.seminars[0].id, 'name': 'seminar0'}])
+
+    def test_batch_seminar_invalid(self):
+        response = self.client.get('/api/v1/seminar/?ids=1,a')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/v1/seminar/?ids={}'.format(','.join(map(str, range(1, 102)))))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BulkEnrollmentTestCase(SeminarTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.instructor = self.create_user('instructor', role='instructor')
+        self.seminar = self.create_seminar(self.instructor, capacity=40)
+        User.objects.bulk_create([User(username='bulk{}'.format(i)) for i in range(50)])
+        self.users = list(User.objects.filter(username__startswith='bulk').order_by('id').values_list('id', flat=True))
+        ParticipantProfile.objects.bulk_create([
+            ParticipantProfile(user_id=user_id, accepted=i != 0) for i, user_id in enumerate(self.users)
+        ])
+        self.url = '/api/v1/seminar/{}/users/bulk/'.format(self.seminar.id)
+
+    def enroll(self, user, ids):
+        return self.client.post(self.url, {'users': ids}, content_type='application/json', **self.auth(user))
+
+    def test_bulk_enrollment(self):
+        self.client.get('/api/v1/seminar/{}/'.format(self.seminar.id))
+        dropped = self.users[1]
+        UserSeminar.objects.create(user_id=dropped, seminar=self.seminar, role=UserSeminar.PARTICIPANT,
+                                   dropped_at=timezone.now())
+        ids = self.users + [self.users[2], self.instructor.id, 0]
+        with self.assertNumQueries(10):
+            response = self.enroll(self.instructor, ids)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        statuses = [result['status'] for result in data['results']]
+        self.assertEqual(statuses[:3], ['not_accepted', 'dropped', 'enrolled'])
+        self.assertEqual(statuses.count('enrolled'), 40)
+        self.assertEqual(statuses.count('full'), 8)
+        self.assertEqual(statuses[-3:], ['duplicate', 'not_participant', 'not_found'])
+        self.assertEqual(data['enrolled'], 40)
+
+        self.seminar.refresh_from_db()
+        self.assertEqual(self.seminar.active_participant_count, 40)
+        response = self.client.get('/api/v1/seminar/{}/'.format(self.seminar.id))
+        self.assertEqual(len(response.json()['participants']), 41)
+
+        response = self.enroll(self.instructor, self.users[2:3])
+        self.assertEqual(response.json()['results'], [{'id': self.users[2], 'status': 'already_member'}])
+
+    def test_bulk_enrollment_forbidden(self):
+        participant = self.create_user('participant')
+        response = self.enroll(participant, self.users)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.enroll(self.instructor, ['1'])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        for body in (self.users[:2], 1):
+            response = self.client.post(self.url, body, content_type='application/json', **self.auth(self.instructor))
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('error', response.json())
+
+
+class SeminarChangeFeedTestCase(SeminarTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.seminars = []
+        for i in range(3):
+            instructor = self.create_user('instructor{}'.format(i), role='instructor')
+            self.seminars.append(self.create_seminar(instructor, name='seminar{}'.format(i)))
+
+    def get_changes(self, since, **params):
+        params['updated_since'] = since.isoformat()
+        response = self.client.get('/api/v1/seminar/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_seminar_changes(self):
+        since = timezone.now()
+        self.assertEqual(self.get_changes(since)['results'], [])
+
+        self.seminars[0].name = 'renamed'
+        self.seminars[0].save()
+        participant = self.create_user('participant')
+        UserSeminar.objects.create(user=participant, seminar=self.seminars[2], role=UserSeminar.PARTICIPANT)
+        deleted = self.seminars[1].id
+        self.seminars[1].delete()
+
+        with self.assertNumQueries(4):
+            data = self.get_changes(since, omit='instructors')
+        self.assertEqual([seminar['name'] for seminar in data['results']], ['renamed', 'seminar2'])
+        self.assertEqual(data['results'][1]['participants'][0]['username'], 'participant')
+        self.assertEqual(data['deleted'], [deleted])
+        self.assertLess(parse_datetime(data['watermark']), timezone.now())
+
+        first = self.get_changes(since, page_size=1)
+        self.assertEqual(len(first['results']), 1)
+        self.assertNotIn('deleted', first)
+        second = self.client.get(first['next']).json()
+        self.assertEqual(second['results'][0]['name'], 'seminar2')
+        self.assertEqual(second['deleted'], [deleted])
+
+    def seminar_updates(self, queries):
+        update = 'UPDATE {} '.format(connection.ops.quote_name(Seminar._meta.db_table))
+        return [query['sql'] for query in queries if query['sql'].startswith(update)]
+
+    def test_member_changes_touch_seminar_once(self):
+        participant = self.create_user('participant')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/v1/seminar/{}/user/'.format(self.seminars[0].id),
+                                        {'role': 'participant'}, **self.auth(participant))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(self.seminar_updates(queries)), 1)
+
+        for i in range(3):
+            UserSeminar.objects.create(user=self.create_user('member{}'.format(i)), seminar=self.seminars[1],
+                                       role=UserSeminar.PARTICIPANT)
+        with CaptureQueriesContext(connection) as queries:
+            self.seminars[1].delete()
+        self.assertEqual(self.seminar_updates(queries), [])
+
+    def test_seminar_changes_invalid(self):
+        response = self.client.get('/api/v1/seminar/', {'updated_since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SeminarAsyncRoutesTestCase(TestCase):
+
+    def test_router(self):
+        router = AsyncReadRouter(async_views=True)
+        router.register('seminar', SeminarViewSet, basename='seminar')
+        callbacks = {url.name: url.callback for url in router.urls}
+        self.assertTrue(asyncio.iscoroutinefunction(callbacks['seminar-list']))
+        self.assertTrue(asyncio.iscoroutinefunction(callbacks['seminar-detail']))
+        self.assertFalse(asyncio.iscoroutinefunction(callbacks['seminar-user']))
+        self.assertEqual(callbacks['seminar-list'].cls, SeminarViewSet)
@@ -1,10 +1,10 @@
 from django.urls import include, path
-from rest_framework.routers import SimpleRouter
 from seminar.views import SeminarViewSet
+from waffle_backend.asyncviews import AsyncReadRouter
 
 app_name = 'seminar'
 
-router = SimpleRouter()
+router = AsyncReadRouter()
 router.register('seminar', SeminarViewSet, basename='seminar')  # /api/v1/seminar/
 
 urlpatterns = [
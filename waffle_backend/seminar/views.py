@@ -1,18 +1,31 @@
-from django.core.exceptions import ObjectDoesNotExist
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Prefetch, prefetch_related_objects
 from django.utils import timezone
-from django.db.models import Prefetch, Count, Q
 from rest_framework import status, viewsets
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from seminar.models import Seminar, UserSeminar
+from seminar import cache as seminar_cache
+from seminar.models import Seminar, Tombstone, UserSeminar
+from seminar.search import filter_seminars, search_seminars
 from seminar.serializers import SeminarSerializer, SimpleSeminarSerializer
+from waffle_backend import conditional
+from waffle_backend.batch import get_batch_ids, order_batch
+from waffle_backend.changes import change_feed, get_watermark
+from waffle_backend.pagination import KeysetPagination
+from waffle_backend.sparse import SparseFieldsViewMixin, project
 
 
-class SeminarViewSet(viewsets.GenericViewSet):
+BULK_ENROLLMENT_LIMIT = 1000
+
+
+class SeminarViewSet(SparseFieldsViewMixin, viewsets.GenericViewSet):
     queryset = Seminar.objects.all()
     serializer_class = SeminarSerializer
     permission_classes = (IsAuthenticated, )
+    pagination_class = KeysetPagination
+    async_actions = ('list', 'retrieve')
 
     def get_permissions(self):
         if self.action in ('retrieve', 'list'):
@@ -21,10 +34,49 @@ class SeminarViewSet(viewsets.GenericViewSet):
             return super(SeminarViewSet, self).get_permissions()
 
     def get_serializer_class(self):
-        if self.action == 'list':
+        params = self.request.query_params
+        if self.action == 'list' and 'ids' not in params and 'updated_since' not in params:
             return SimpleSeminarSerializer
         return self.serializer_class
 
+    def get_queryset(self):
+        queryset = super(SeminarViewSet, self).get_queryset()
+        if self.action == 'list':
+            return queryset.prefetch_related(
+                *self.get_member_prefetches(instructors=self.is_requested('instructors'), participants=False)
+            )
+        if self.action in ('retrieve', 'bulk_users'):
+            # Members are prefetched once the conditional request validators have been checked,
+            # and bulk enrollment only ever looks at the members it is about to add.
+            return queryset
+        return queryset.prefetch_related(*self.get_member_prefetches())
+
+    def get_member_prefetches(self, instructors=True, participants=True):
+        prefetches = []
+        if instructors:
+            prefetches.append(
+                Prefetch(
+                    'user_seminar',
+                    queryset=UserSeminar.objects.filter(role=UserSeminar.INSTRUCTOR).select_related('user'),
+                    to_attr='userseminar_instructors'
+                )
+            )
+        if participants:
+            prefetches.append(
+                Prefetch(
+                    'user_seminar',
+                    queryset=UserSeminar.objects.filter(role=UserSeminar.PARTICIPANT).select_related('user'),
+                    to_attr='userseminar_participants'
+                )
+            )
+        return prefetches
+
+    def get_userseminar(self, user, seminar):
+        for userseminar in seminar.userseminar_instructors + seminar.userseminar_participants:
+            if userseminar.user_id == user.id:
+                return userseminar
+        return None
+
     def create(self, request):
         user = request.user
         if not hasattr(user, 'instructor'):
@@ -32,25 +84,27 @@ class SeminarViewSet(viewsets.GenericViewSet):
                 {"error": "Only instructors can create seminars"},
                 status=status.HTTP_403_FORBIDDEN
             )
-        if UserSeminar.objects.filter(user=user, role='instructor').exists():
+        if UserSeminar.objects.filter(user=user, role=UserSeminar.INSTRUCTOR).exists():
             return Response(
                 {"error": "The user is an instructor of another seminar"},
                 status=status.HTTP_400_BAD_REQUEST
             )
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        seminar = serializer.save()
-        UserSeminar.objects.create(
-            user=user,
-            seminar=seminar,
-            role='instructor',
-        )
+        with transaction.atomic():
+            seminar = serializer.save(instructor_count=1)
+            userseminar = UserSeminar(user=user, seminar=seminar, role=UserSeminar.INSTRUCTOR)
+            userseminar.seminar_touched = True
+            userseminar.save(force_insert=True)
+        seminar.userseminar_instructors = [userseminar]
+        seminar.userseminar_participants = []
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def update(self, request, pk):
         user = request.user
         seminar = self.get_object()
-        if not UserSeminar.objects.filter(user=user, seminar=seminar, role='instructor').exists():
+        userseminar = self.get_userseminar(user, seminar)
+        if userseminar is None or userseminar.role != UserSeminar.INSTRUCTOR:
             return Response(
                 {"error": "Only instructors of this seminar can change information"},
                 status=status.HTTP_403_FORBIDDEN
@@ -58,42 +112,128 @@ class SeminarViewSet(viewsets.GenericViewSet):
 
         serializer = self.get_serializer(seminar, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        participants = UserSeminar.objects.filter(seminar=seminar, role='participant').count()
-        if 'capacity' in request.data and serializer.validated_data.get('capacity') < participants:
-            return Response(
-                {"error": "Cannot set capacity less than the number of participants"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        serializer.update(seminar, serializer.validated_data)
+        with transaction.atomic():
+            participants, instructors = Seminar.objects.select_for_update()\
+                .values_list('active_participant_count', 'instructor_count')\
+                .get(pk=seminar.pk)
+            if 'capacity' in request.data and serializer.validated_data.get('capacity') < participants:
+                return Response(
+                    {"error": "Cannot set capacity less than the number of participants"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            seminar.active_participant_count = participants
+            seminar.instructor_count = instructors
+            serializer.update(seminar, serializer.validated_data)
         return Response(serializer.data)
 
     def retrieve(self, request, pk=None):
-        seminar = self.get_object()
-        return Response(self.get_serializer(seminar).data)
+        key = seminar_cache.detail_key(pk)
+        entry = seminar_cache.get(key)
+        if entry is None:
+            seminar = self.get_object()
+            # Every change to a seminar or its members touches seminar.updated_at.
+            etag = conditional.make_etag('seminar', seminar.pk, seminar.updated_at)
+            response = conditional.not_modified(request, self.get_sparse_etag(etag), seminar.updated_at)
+            if response is not None:
+                return response
+            prefetch_related_objects([seminar], *self.get_member_prefetches(
+                instructors=self.is_requested('instructors'),
+                participants=self.is_requested('participants'),
+            ))
+            if self.is_sparse():
+                # Only full representations are cached; sparse ones are projected from them on a hit.
+                data = self.get_serializer(seminar).data
+                return conditional.conditional_response(
+                    request, data, self.get_sparse_etag(etag), seminar.updated_at
+                )
+            entry = {
+                'data': self.get_serializer(seminar).data,
+                'etag': etag,
+                'last_modified': seminar.updated_at,
+            }
+            seminar_cache.set(key, entry)
+        return conditional.conditional_response(
+            request,
+            project(entry['data'], *self.get_sparse_fields()),
+            self.get_sparse_etag(entry['etag']),
+            entry['last_modified'],
+        )
 
     def list(self, request):
-        param = request.query_params
-        name = param.get('name', '')
-        seminars = self.get_queryset()\
-            .filter(name__contains=name)\
-            .prefetch_related(
-                Prefetch(
-                    'user_seminar',
-                    queryset=UserSeminar.objects.filter(role='instructor'),
-                    to_attr='userseminar_instructors'
-                )
-            ).prefetch_related('userseminar_instructors__user')
-        seminars = seminars.annotate(
-            participant_count=Count(
-                'user_seminar',
-                filter=Q(user_seminar__role='participant') & Q(user_seminar__dropped_at=None)
+        try:
+            ids = get_batch_ids(request)
+            since = get_watermark(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if ids is not None:
+            return self.batch(ids)
+        if since is not None:
+            return change_feed(
+                request,
+                self.get_queryset().prefetch_related(*self.get_member_prefetches(
+                    instructors=False,
+                    participants=self.is_requested('participants'),
+                )),
+                Tombstone.objects.filter(kind=Tombstone.SEMINAR),
+                lambda page: self.get_serializer(page, many=True).data,
+                since,
             )
+
+        key = seminar_cache.list_key(request)
+        entry = seminar_cache.get(key)
+        if entry is None:
+            etag, last_modified = self.get_list_validators(request)
+            response = conditional.not_modified(request, etag, last_modified)
+            if response is not None:
+                return response
+            entry = {
+                'data': self.get_list_data(request),
+                'etag': etag,
+                'last_modified': last_modified,
+            }
+            seminar_cache.set(key, entry)
+        return conditional.conditional_response(request, entry['data'], entry['etag'], entry['last_modified'])
+
+    def batch(self, ids):
+        # Full representations of many seminars, with a query count that does not depend on len(ids).
+        seminars = Seminar.objects.filter(id__in=ids).prefetch_related(*self.get_member_prefetches(
+            instructors=self.is_requested('instructors'),
+            participants=self.is_requested('participants'),
+        ))
+        seminars, missing = order_batch(seminars, ids)
+        return Response({
+            'results': self.get_serializer(seminars, many=True).data,
+            'missing': missing,
+        })
+
+    def get_list_validators(self, request):
+        param = request.query_params
+        seminars = Seminar.objects.all()
+        if not param.get('search'):
+            seminars = filter_seminars(seminars, param.get('name', ''))
+        latest = seminars.aggregate(updated_at=Max('updated_at'), count=Count('id'))
+        etag = conditional.make_etag(
+            'seminar-list',
+            request.get_host(),
+            [param.get(name, '') for name in seminar_cache.LIST_PARAMS],
+            latest['updated_at'],
+            latest['count'],
         )
+        return etag, latest['updated_at']
+
+    def get_list_data(self, request):
+        param = request.query_params
+        seminars = self.get_queryset()
+        if param.get('search'):
+            page = search_seminars(seminars, param['search'], limit=self.paginator.get_page_size(request))
+            return {'next': None, 'results': self.get_serializer(page, many=True).data}
+        seminars = filter_seminars(seminars, param.get('name', ''))
         if param.get('order', '') == 'earliest':
-            seminars = seminars.order_by('created_at')
+            seminars = seminars.order_by('created_at', 'id')
         else:
-            seminars = seminars.order_by('-created_at')
-        return Response(self.get_serializer(seminars, many=True).data)
+            seminars = seminars.order_by('-created_at', '-id')
+        page = self.paginate_queryset(seminars)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data).data
 
     @action(detail=True, methods=['POST', 'DELETE'])
     def user(self, request, pk):
@@ -105,7 +245,7 @@ class SeminarViewSet(viewsets.GenericViewSet):
             return self.drop_seminar(user, seminar)
 
     def attend_seminar(self, user, seminar, role):
-        if role not in ('participant', 'instructor'):
+        if not isinstance(role, str) or role not in UserSeminar.ROLES:
             return Response(
                 {"error": "Role should be participant or instructor"},
                 status=status.HTTP_400_BAD_REQUEST)
@@ -114,9 +254,9 @@ class SeminarViewSet(viewsets.GenericViewSet):
                 {"error": "The user is not a {}".format(role)},
                 status=status.HTTP_403_FORBIDDEN
             )
-        try:
-            userseminar = UserSeminar.objects.get(user=user, seminar=seminar)
-            if userseminar.dropped_at is None:
+        userseminar = self.get_userseminar(user, seminar)
+        if userseminar is not None:
+            if userseminar.dropped_at is not None:
                 return Response(
                     {"error": "The user have already dropped out from the seminar"},
                     status=status.HTTP_400_BAD_REQUEST
@@ -126,53 +266,155 @@ class SeminarViewSet(viewsets.GenericViewSet):
                     {"error": "The user is already a member of the seminar"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-        except ObjectDoesNotExist:
-            pass
         if role == 'participant':
             if not user.participant.accepted:
                 return Response(
                     {"error": "The user is not accepted"},
                     status=status.HTTP_403_FORBIDDEN
                 )
-            participants = UserSeminar.objects.filter(
-                seminar=seminar,
-                role='participant',
-                dropped_at=None,
-            ).count()
-            if participants == seminar.capacity:
-                return Response(
-                    {"error": "This seminar is already full"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
         elif role == 'instructor':
-            if UserSeminar.objects.filter(user=user, role='instructor').exists():
+            if UserSeminar.objects.filter(user=user, role=UserSeminar.INSTRUCTOR).exists():
                 return Response(
                     {"error": "The user is an instructor of another seminar"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-        UserSeminar.objects.create(
-            user=user,
-            seminar=seminar,
-            role=role,
-        )
+        try:
+            with transaction.atomic():
+                if role == 'participant' and not self.reserve_seat(seminar):
+                    return Response(
+                        {"error": "This seminar is already full"},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                if role == 'instructor':
+                    self.add_instructor(seminar)
+                # reserve_seat and add_instructor have touched the seminar already.
+                userseminar = UserSeminar(user=user, seminar=seminar, role=UserSeminar.ROLES[role])
+                userseminar.seminar_touched = True
+                userseminar.save(force_insert=True)
+        except IntegrityError:
+            return Response(
+                {"error": "The user is already a member of the seminar"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if role == 'participant':
+            seminar.userseminar_participants.append(userseminar)
+        else:
+            seminar.userseminar_instructors.append(userseminar)
         return Response(self.get_serializer(seminar).data, status=status.HTTP_201_CREATED)
 
     def drop_seminar(self, user, seminar):
-        try:
-            userseminar = UserSeminar.objects.get(user=user, seminar=seminar)
-        except ObjectDoesNotExist:
+        userseminar = self.get_userseminar(user, seminar)
+        if userseminar is None:
             return Response()
         if userseminar.dropped_at is not None:
             return Response(
                 {"error": "The user have already dropped out from the seminar"},
                 status=status.HTTP_403_FORBIDDEN
             )
-        if userseminar.role == 'instructor':
+        if userseminar.role == UserSeminar.INSTRUCTOR:
             return Response(
                 {"error": "Instructors cannot drop seminar"},
                 status=status.HTTP_403_FORBIDDEN
             )
-        userseminar.dropped_at = timezone.now()
-        userseminar.save()
+        now = timezone.now()
+        with transaction.atomic():
+            # Only the request that actually marks the membership as dropped gives the seat back.
+            dropped = UserSeminar.objects\
+                .filter(pk=userseminar.pk, dropped_at=None)\
+                .update(dropped_at=now, updated_at=now)
+            if dropped != 1:
+                return Response(
+                    {"error": "The user have already dropped out from the seminar"},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            self.release_seat(seminar)
+            seminar_cache.invalidate_on_commit(seminar.pk)
+        userseminar.dropped_at = userseminar.updated_at = now
         return Response(self.get_serializer(seminar).data)
+
+    @action(detail=True, methods=['POST'], url_path='users/bulk')
+    def bulk_users(self, request, pk):
+        seminar = self.get_object()
+        if not UserSeminar.objects.filter(seminar=seminar, user=request.user, role=UserSeminar.INSTRUCTOR).exists():
+            return Response(
+                {"error": "Only instructors of this seminar can enroll users"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        ids = request.data.get('users') if isinstance(request.data, dict) else None
+        if not isinstance(ids, list) or not ids or not all(type(user_id) is int for user_id in ids):
+            return Response(
+                {"error": "users should be a non-empty list of user ids"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(ids) > BULK_ENROLLMENT_LIMIT:
+            return Response(
+                {"error": "Up to {} users can be enrolled at once".format(BULK_ENROLLMENT_LIMIT)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        outcomes = {}
+        profiles = dict(User.objects.filter(id__in=ids).values_list('id', 'participant__accepted'))
+        for user_id in ids:
+            if user_id in outcomes:
+                continue
+            if user_id not in profiles:
+                outcomes[user_id] = 'not_found'
+            elif profiles[user_id] is None:
+                outcomes[user_id] = 'not_participant'
+            elif not profiles[user_id]:
+                outcomes[user_id] = 'not_accepted'
+
+        with transaction.atomic():
+            # The row lock serializes this with attend_seminar, whose seat reservation updates the same row.
+            participants, capacity = Seminar.objects.select_for_update()\
+                .values_list('active_participant_count', 'capacity')\
+                .get(pk=seminar.pk)
+            candidates = [user_id for user_id in profiles if user_id not in outcomes]
+            members = dict(UserSeminar.objects
+                           .filter(seminar=seminar, user_id__in=candidates)
+                           .values_list('user_id', 'dropped_at'))
+            enrolled = []
+            for user_id in ids:
+                if user_id in outcomes:
+                    continue
+                if user_id in members:
+                    outcomes[user_id] = 'dropped' if members[user_id] is not None else 'already_member'
+                elif participants + len(enrolled) >= capacity:
+                    outcomes[user_id] = 'full'
+                else:
+                    outcomes[user_id] = 'enrolled'
+                    enrolled.append(user_id)
+            if enrolled:
+                UserSeminar.objects.bulk_create([
+                    UserSeminar(user_id=user_id, seminar=seminar, role=UserSeminar.PARTICIPANT)
+                    for user_id in enrolled
+                ])
+                Seminar.objects.filter(pk=seminar.pk).update(
+                    active_participant_count=F('active_participant_count') + len(enrolled),
+                    updated_at=timezone.now(),
+                )
+                # bulk_create and update() send no signals.
+                seminar_cache.invalidate_on_commit(seminar.pk)
+
+        seen = set()
+        results = []
+        for user_id in ids:
+            results.append({'id': user_id, 'status': outcomes[user_id] if user_id not in seen else 'duplicate'})
+            seen.add(user_id)
+        return Response({'enrolled': len(enrolled), 'results': results})
+
+    def reserve_seat(self, seminar):
+        return Seminar.objects\
+            .filter(pk=seminar.pk, active_participant_count__lt=F('capacity'))\
+            .update(active_participant_count=F('active_participant_count') + 1, updated_at=timezone.now()) == 1
+
+    def release_seat(self, seminar):
+        Seminar.objects\
+            .filter(pk=seminar.pk, active_participant_count__gt=0)\
+            .update(active_participant_count=F('active_participant_count') - 1, updated_at=timezone.now())
+
+    def add_instructor(self, seminar):
+        Seminar.objects\
+            .filter(pk=seminar.pk)\
+            .update(instructor_count=F('instructor_count') + 1, updated_at=timezone.now())
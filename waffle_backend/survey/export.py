@@ -0,0 +1,86 @@
+import csv
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+from survey.models import SurveyResult
+
+EXPORT_FIELDS = (
+    ('id', 'id'),
+    ('timestamp', 'timestamp'),
+    ('os', 'os__name'),
+    ('user_id', 'user_id'),
+    ('python', 'python'),
+    ('rdb', 'rdb'),
+    ('programming', 'programming'),
+    ('major', 'major'),
+    ('grade', 'grade'),
+    ('backend_reason', 'backend_reason'),
+    ('waffle_reason', 'waffle_reason'),
+    ('say_something', 'say_something'),
+)
+
+
+class Echo(object):
+
+    def write(self, value):
+        return value
+
+
+def iterate_rows(chunk_size=2000):
+    # Pages by primary key instead of relying on server-side cursors, which the MySQL driver
+    # does not provide: memory stays bounded by chunk_size on every backend.
+    fields = [field for name, field in EXPORT_FIELDS]
+    queryset = SurveyResult.objects.order_by('id').values_list(*fields)
+    last = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last)[:chunk_size])
+        if not rows:
+            return
+        yield from rows
+        last = rows[-1][0]
+
+
+def format_row(row):
+    row = list(row)
+    if row[1] is not None:
+        row[1] = row[1].isoformat()
+    return row
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow([name for name, field in EXPORT_FIELDS])
+    for row in rows:
+        yield writer.writerow(format_row(row))
+
+
+def stream_ndjson(rows):
+    names = [name for name, field in EXPORT_FIELDS]
+    for row in rows:
+        yield json.dumps(dict(zip(names, format_row(row))), ensure_ascii=False) + '\n'
+
+
+def stream_csv_dict(data):
+    writer = csv.writer(Echo())
+    yield writer.writerow(data.keys())
+    yield writer.writerow(data.values())
+
+
+class CSVRenderer(BaseRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Exports are streamed directly; only error payloads are rendered here.
+        return ''.join(stream_csv_dict(data or {}))
+
+
+class NDJSONRenderer(BaseRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False) + '\n'
@@ -0,0 +1,37 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from survey.export import iterate_rows, stream_csv, stream_ndjson
+from survey.models import SurveyResult
+
+STREAMS = {
+    'csv': stream_csv,
+    'ndjson': stream_ndjson,
+}
+
+
+class Command(BaseCommand):
+    help = "Measure time and peak memory of streaming every survey result through the export formats"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(STREAMS), action='append', dest='formats')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        count = SurveyResult.objects.count()
+        self.stdout.write("Exporting {} survey results".format(count))
+        for name in options['formats'] or sorted(STREAMS):
+            tracemalloc.start()
+            start = time.perf_counter()
+            rows = size = 0
+            for chunk in STREAMS[name](iterate_rows(chunk_size=options['chunk_size'])):
+                rows += 1
+                size += len(chunk.encode('utf-8'))
+            elapsed = time.perf_counter() - start
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.stdout.write("{:7s} {:>9} lines {:>9.1f}MB {:>8.2f}s {:>9.0f} rows/s  peak {:.1f}MB".format(
+                name, rows, size / 2 ** 20, elapsed, rows / elapsed if elapsed else 0, peak / 2 ** 20
+            ))
@@ -1,34 +1,139 @@
-from django.core.management.base import BaseCommand
+import hashlib
+import time
+from collections import Counter
 
-from survey.models import OperatingSystem, SurveyResult
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
+from survey import stats
+from survey.models import OperatingSystem, SurveyResult
 
-def download_survey():
-    # NOTE: if you run this command multiple times, rows of 'survey_surveyresult' table will be added repeatedly.
+DEFAULT_OPERATING_SYSTEMS = (
+    ('Windows', 200000, "Most favorite OS in South Korea"),
+    ('MacOS', 300000, "Most favorite OS of Seminar Instructors"),
+    ('Linux', 0, "Linus Benedict Torvalds"),
+)
 
-    path = ''  # NOTE: you should assign proper directory path
-    if not path:
-        raise Exception("Please specify path of directory including 'example_surveyresult.tsv'!")
-    tsv_file = f"{path}/example_surveyresult.tsv"
+SCORE_COLUMNS = (('python', 2), ('rdb', 3), ('programming', 4))
+TEXT_COLUMNS = (('major', 5), ('grade', 6), ('backend_reason', 7), ('waffle_reason', 8), ('say_something', 9))
+FIELDS = tuple(name for name, column in SCORE_COLUMNS + TEXT_COLUMNS)
+SCORES = {value for value, label in SurveyResult.EXPERIENCE_DEGREE}
 
-    OperatingSystem.objects.get_or_create(name='Windows', price=200000, description="Most favorite OS in South Korea")
-    OperatingSystem.objects.get_or_create(name='MacOS', price=300000, description="Most favorite OS of Seminar Instructors")
-    OperatingSystem.objects.get_or_create(name='Linux', price=0, description="Linus Benedict Torvalds")
 
-    with open(tsv_file) as f:
+def read_rows(path):
+    with open(path, encoding='utf-8') as f:
         for idx, line in enumerate(f, start=1):
             if idx < 2:
                 continue
+            line = line.rstrip('\r\n')
+            if not line.strip():
+                continue
+            yield idx, [value.strip() for value in line.split('\t')]
+
+
+def content_hash(os_name, fields, occurrence):
+    # A row is identified by the answers it stores and how many identical answers came before it in
+    # the file, so re-running the same (or an appended or reordered) file skips the rows that were
+    # already imported while identical answers still count separately.
+    content = '\t'.join([os_name] + [str(fields[name]) for name in FIELDS])
+    return hashlib.sha1('{}\t{}'.format(occurrence, content).encode('utf-8')).hexdigest()
+
+
+def parse_row(data):
+    # Returns the SurveyResult fields of a row, or raises ValueError saying what is wrong with it.
+    if len(data) < 10:
+        raise ValueError("{} columns, expected 10".format(len(data)))
+    if not data[1]:
+        raise ValueError("no operating system")
+    fields = {}
+    for name, column in SCORE_COLUMNS:
+        try:
+            fields[name] = int(data[column])
+        except ValueError:
+            fields[name] = None
+        if fields[name] not in SCORES:
+            raise ValueError("{} score '{}' is not one of 1-5".format(name, data[column]))
+    for name, column in TEXT_COLUMNS:
+        max_length = SurveyResult._meta.get_field(name).max_length
+        if len(data[column]) > max_length:
+            raise ValueError("{} is longer than {} characters".format(name, max_length))
+        fields[name] = data[column]
+    if len(data[1]) > OperatingSystem._meta.get_field('name').max_length:
+        raise ValueError("operating system name is too long")
+    return fields
+
 
-            data = line.split('\t')
+class OperatingSystemMap(object):
 
-            operating_system, created = OperatingSystem.objects.get_or_create(name=data[1])
-            SurveyResult.objects.create(timestamp=data[0], os=operating_system, python=int(data[2]), rdb=int(data[3]),
-                                        programming=int(data[4]), major=data[5], grade=data[6],
-                                        backend_reason=data[7], waffle_reason=data[8], say_something=data[9])
+    def __init__(self):
+        for name, price, description in DEFAULT_OPERATING_SYSTEMS:
+            OperatingSystem.objects.get_or_create(name=name, price=price, description=description)
+        self.ids = {}
+        for name, pk in OperatingSystem.objects.order_by('-id').values_list('name', 'id'):
+            self.ids[name] = pk
+
+    def __getitem__(self, name):
+        if name not in self.ids:
+            operating_system, created = OperatingSystem.objects.get_or_create(name=name)
+            self.ids[name] = operating_system.pk
+        return self.ids[name]
+
+
+def create_new(batch):
+    # Rows whose hash is already stored were imported by an earlier run.
+    existing = set(SurveyResult.objects.filter(
+        content_hash__in=[survey.content_hash for survey in batch]
+    ).values_list('content_hash', flat=True))
+    SurveyResult.objects.bulk_create([survey for survey in batch if survey.content_hash not in existing])
+
+
+def download_survey(path, batch_size=5000):
+    # Returns the number of valid rows read and the number of rows imported, and a list of
+    # (line number, error) for the rows that were skipped.
+    operating_systems = OperatingSystemMap()
+    read = 0
+    invalid = []
+    seen = Counter()
+    before = SurveyResult.objects.count()
+    with transaction.atomic():
+        batch = []
+        for line_number, data in read_rows(path):
+            try:
+                fields = parse_row(data)
+            except ValueError as e:
+                invalid.append((line_number, str(e)))
+                continue
+            key = (data[1], ) + tuple(fields[name] for name in FIELDS)
+            seen[key] += 1
+            batch.append(SurveyResult(
+                content_hash=content_hash(data[1], fields, seen[key]), os_id=operating_systems[data[1]], **fields
+            ))
+            read += 1
+            if len(batch) >= batch_size:
+                create_new(batch)
+                batch = []
+        if batch:
+            create_new(batch)
+    transaction.on_commit(stats.invalidate)
+    return read, SurveyResult.objects.count() - before, invalid
 
 
 class Command(BaseCommand):
+    help = "Import survey results from a TSV file such as 'example_surveyresult.tsv'"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path of the TSV file to import")
+        parser.add_argument('--batch-size', type=int, default=5000)
 
     def handle(self, *args, **options):
-        download_survey()
+        start = time.perf_counter()
+        try:
+            read, imported, invalid = download_survey(options['path'], batch_size=options['batch_size'])
+        except FileNotFoundError:
+            raise CommandError("File '{}' does not exist".format(options['path']))
+        elapsed = time.perf_counter() - start
+        for line_number, error in invalid:
+            self.stderr.write("Skipped line {}: {}".format(line_number, error))
+        self.stdout.write("Imported {} of {} rows ({} already present, {} invalid) in {:.2f}s, {:.0f} rows/s".format(
+            imported, read, read - imported, len(invalid), elapsed, read / elapsed if elapsed else 0
+        ))
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.14 on 2026-10-17 23:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0002_auto_20200912_0149'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='surveyresult',
+            index=models.Index(fields=['timestamp', 'id'], name='survey_surv_timesta_0270cd_idx'),
+        ),
+    ]
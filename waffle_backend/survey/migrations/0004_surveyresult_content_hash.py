@@ -0,0 +1,18 @@
+# Generated by Django 3.1.14 on 2026-10-17 23:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0003_auto_20261018_0838'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='surveyresult',
+            name='content_hash',
+            field=models.CharField(editable=False, max_length=40, null=True, unique=True),
+        ),
+    ]
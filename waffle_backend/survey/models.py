@@ -28,3 +28,9 @@ class SurveyResult(models.Model):
     waffle_reason = models.CharField(max_length=500, blank=True)
     say_something = models.CharField(max_length=500, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
+    content_hash = models.CharField(max_length=40, unique=True, null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['timestamp', 'id']),
+        ]
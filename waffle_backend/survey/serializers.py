@@ -1,10 +1,11 @@
 from rest_framework import serializers
 
 from survey.models import OperatingSystem, SurveyResult
-from user.serializers import UserSerializer
+from user.serializers import SimpleUserSerializer, UserSerializer
+from waffle_backend.sparse import SparseFieldsMixin
 
 
-class SurveyResultSerializer(serializers.ModelSerializer):
+class SurveyResultSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     os = serializers.SerializerMethodField()
     user = serializers.SerializerMethodField()
     os_name = serializers.CharField(write_only=True)
@@ -34,9 +35,11 @@ class SurveyResultSerializer(serializers.ModelSerializer):
         return None
 
     def get_user(self, survey):
-        if survey.user:
+        if not survey.user:
+            return None
+        if 'user' in self.context.get('expand', ()):
             return UserSerializer(survey.user, context=self.context).data
-        return None
+        return SimpleUserSerializer(survey.user, context=self.context).data
 
     def create(self, validated_data):
         os, created = OperatingSystem.objects.get_or_create(name=validated_data.pop('os_name'))
@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from survey import stats
+from survey.models import OperatingSystem, SurveyResult
+
+
+@receiver(post_save, sender=SurveyResult)
+def update_stats(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: stats.add_survey(instance))
+    else:
+        transaction.on_commit(stats.invalidate)
+
+
+@receiver(post_delete, sender=SurveyResult)
+@receiver(post_save, sender=OperatingSystem)
+@receiver(post_delete, sender=OperatingSystem)
+def invalidate_stats(sender, **kwargs):
+    transaction.on_commit(stats.invalidate)
@@ -0,0 +1,112 @@
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count
+
+from survey.models import SurveyResult
+
+SCORES = ('python', 'rdb', 'programming')
+GROUPS = ('os', 'grade')
+CELL_FIELDS = ('os__name', 'grade') + SCORES
+CACHE_KEY = 'survey:stats:cells'
+PERCENTILES = (25, 50, 75, 90)
+
+
+def get_cache():
+    return caches[settings.SURVEY_STATS_CACHE['ALIAS']]
+
+
+def compute_cells():
+    # One GROUP BY over every dimension; the result has at most |os| * |grade| * 5^3 rows and
+    # every histogram and cross-tab is derived from it.
+    rows = SurveyResult.objects.values_list(*CELL_FIELDS).annotate(count=Count('id')).order_by()
+    return {tuple(row[:-1]): row[-1] for row in rows}
+
+
+def counter_key(generation, index):
+    return 'survey:stats:{}:{}'.format(generation, index)
+
+
+def get_cells():
+    # The cache holds the list of known cells under CACHE_KEY and each cell's count under a key of
+    # its own, so inserts update their cell with an atomic incr instead of rewriting the whole dict.
+    cache = get_cache()
+    cached = cache.get(CACHE_KEY)
+    if cached is not None:
+        generation, cells = cached
+        keys = [counter_key(generation, index) for index in range(len(cells))]
+        counts = cache.get_many(keys)
+        if len(counts) == len(keys):
+            return {cell: counts[key] for cell, key in zip(cells, keys)}
+    cells = compute_cells()
+    generation = uuid.uuid4().hex
+    timeout = settings.SURVEY_STATS_CACHE['TIMEOUT']
+    # Counters first, so they never outlive the list pointing at them.
+    cache.set_many({counter_key(generation, index): count for index, count in enumerate(cells.values())}, timeout)
+    cache.set(CACHE_KEY, (generation, list(cells)), timeout)
+    return cells
+
+
+def add_survey(survey):
+    cache = get_cache()
+    cached = cache.get(CACHE_KEY)
+    if cached is None:
+        return
+    generation, cells = cached
+    cell = (survey.os.name if survey.os else None, survey.grade) + tuple(getattr(survey, score) for score in SCORES)
+    try:
+        cache.incr(counter_key(generation, cells.index(cell)))
+    except ValueError:
+        # A combination not seen yet, or an evicted counter: recompute on the next read.
+        invalidate()
+
+
+def invalidate():
+    get_cache().delete(CACHE_KEY)
+
+
+def describe(histogram):
+    total = sum(histogram.values())
+    if not total:
+        return {'count': 0, 'histogram': {}, 'mean': None, 'percentiles': {}}
+    values = sorted(histogram)
+    percentiles = {}
+    for percentile in PERCENTILES:
+        rank = max(1, -(-percentile * total // 100))
+        seen = 0
+        for value in values:
+            seen += histogram[value]
+            if seen >= rank:
+                percentiles['p{}'.format(percentile)] = value
+                break
+    return {
+        'count': total,
+        'histogram': {value: histogram[value] for value in values},
+        'mean': sum(value * count for value, count in histogram.items()) / total,
+        'percentiles': percentiles,
+    }
+
+
+def summarize(cells):
+    histograms = {score: Counter() for score in SCORES}
+    crosstabs = {group: {score: {} for score in SCORES} for group in GROUPS}
+    for cell, count in cells.items():
+        groups, scores = cell[:len(GROUPS)], cell[len(GROUPS):]
+        for score, value in zip(SCORES, scores):
+            histograms[score][value] += count
+            for group, key in zip(GROUPS, groups):
+                crosstabs[group][score].setdefault(key or '', Counter())[value] += count
+    return {
+        'count': sum(cells.values()),
+        'scores': {score: describe(histograms[score]) for score in SCORES},
+        'by_os': {
+            score: {key: describe(histogram) for key, histogram in sorted(crosstabs['os'][score].items())}
+            for score in SCORES
+        },
+        'by_grade': {
+            score: {key: describe(histogram) for key, histogram in sorted(crosstabs['grade'][score].items())}
+            for score in SCORES
+        },
+    }
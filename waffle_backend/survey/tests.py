@@ -1,3 +1,210 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+import os
+import tempfile
+import threading
+from unittest.mock import patch
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from seminar.models import Seminar, UserSeminar
+from survey import stats as survey_stats
+from survey.models import OperatingSystem, SurveyResult
+from user.models import InstructorProfile, ParticipantProfile
+
+
+class GetSurveyResultTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', email='user@mail.com', password='password')
+        self.os = OperatingSystem.objects.create(name='Linux')
+        self.survey = SurveyResult.objects.create(user=self.user, os=self.os, python=3, rdb=2, programming=4)
+
+    def test_get_survey_not_modified(self):
+        url = '/api/v1/survey/{}/'.format(self.survey.id)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.os.description = 'Linus Benedict Torvalds'
+        self.os.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ListSurveyResultTestCase(TestCase):
+
+    def setUp(self):
+        linux = OperatingSystem.objects.create(name='Linux')
+        seminar = Seminar.objects.create(name='waffle', capacity=100, count=5, time=datetime.time(14, 0), online=True)
+        for i in range(10):
+            user = User.objects.create_user(username='user{}'.format(i), email='user{}@mail.com'.format(i))
+            ParticipantProfile.objects.create(user=user, university='SNU', accepted=True)
+            if i % 2:
+                InstructorProfile.objects.create(user=user, company='Waffle', year=i)
+                UserSeminar.objects.create(user=user, seminar=seminar, role=UserSeminar.INSTRUCTOR)
+            else:
+                UserSeminar.objects.create(user=user, seminar=seminar, role=UserSeminar.PARTICIPANT)
+            SurveyResult.objects.create(user=user, os=linux, python=3, rdb=2, programming=4)
+
+    def test_list_survey_compact_user(self):
+        with self.assertNumQueries(1):
+            data = self.client.get('/api/v1/survey/?page_size=100').json()
+        self.assertEqual(len(data['results']), 10)
+        self.assertEqual(set(data['results'][0]['user']), {'id', 'username', 'email'})
+
+    def test_list_survey_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get('/api/v1/survey/?fields=id,python').json()
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('JOIN', queries[0]['sql'])
+        self.assertEqual(set(data['results'][0]), {'id', 'python'})
+
+    def test_list_survey_expand_user(self):
+        with self.assertNumQueries(4):
+            data = self.client.get('/api/v1/survey/?page_size=100&expand=user').json()
+        users = {survey['user']['username']: survey['user'] for survey in data['results']}
+        self.assertEqual(users['user0']['participant']['seminars'][0]['name'], 'waffle')
+        self.assertIsNone(users['user0']['instructor'])
+        self.assertEqual(users['user1']['instructor']['charge']['name'], 'waffle')
+        self.assertEqual(users['user1']['participant']['seminars'], [])
+
+
+class SurveyStatsTestCase(TransactionTestCase):
+
+    def setUp(self):
+        survey_stats.invalidate()
+        linux = OperatingSystem.objects.create(name='Linux')
+        windows = OperatingSystem.objects.create(name='Windows')
+        SurveyResult.objects.create(os=linux, python=5, rdb=3, programming=4, grade='4학년')
+        SurveyResult.objects.create(os=linux, python=3, rdb=3, programming=2, grade='2학년')
+        SurveyResult.objects.create(os=windows, python=1, rdb=1, programming=1, grade='2학년')
+
+    def test_survey_stats(self):
+        data = self.client.get('/api/v1/survey/stats/').json()
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(data['scores']['python']['histogram'], {'1': 1, '3': 1, '5': 1})
+        self.assertEqual(data['scores']['python']['mean'], 3)
+        self.assertEqual(data['scores']['python']['percentiles']['p50'], 3)
+        self.assertEqual(data['by_os']['python']['Linux']['mean'], 4)
+        self.assertEqual(data['by_grade']['rdb']['2학년']['histogram'], {'1': 1, '3': 1})
+
+    def test_survey_stats_updated_incrementally(self):
+        self.client.get('/api/v1/survey/stats/')
+        windows = OperatingSystem.objects.get(name='Windows')
+        SurveyResult.objects.create(os=windows, python=1, rdb=1, programming=1, grade='2학년')
+        with self.assertNumQueries(0):
+            data = self.client.get('/api/v1/survey/stats/').json()
+        self.assertEqual(data['count'], 4)
+        self.assertEqual(data['by_os']['python']['Windows']['histogram'], {'1': 2})
+
+        # A combination without a counter yet is picked up by recomputing.
+        SurveyResult.objects.create(os=windows, python=5, rdb=5, programming=5)
+        data = self.client.get('/api/v1/survey/stats/').json()
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(data['by_os']['python']['Windows']['histogram'], {'1': 2, '5': 1})
+
+    def test_survey_stats_concurrent_inserts(self):
+        self.client.get('/api/v1/survey/stats/')
+        linux = OperatingSystem.objects.get(name='Linux')
+        surveys = [SurveyResult(os=linux, python=3, rdb=3, programming=2, grade='2학년') for _ in range(20)]
+        cache = survey_stats.get_cache()
+        barrier = threading.Barrier(len(surveys))
+        get = type(cache).get
+
+        def get_then_wait(*args, **kwargs):
+            # Every insert reads the cache before any of them writes to it. Each thread has its own
+            # cache object, so the class is patched.
+            value = get(*args, **kwargs)
+            barrier.wait(timeout=5)
+            return value
+
+        with patch.object(type(cache), 'get', get_then_wait):
+            threads = [threading.Thread(target=survey_stats.add_survey, args=(survey, )) for survey in surveys]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        with self.assertNumQueries(0):
+            data = self.client.get('/api/v1/survey/stats/').json()
+        self.assertEqual(data['by_os']['python']['Linux']['histogram'], {'3': 21, '5': 1})
+
+
+class DownloadSurveyTestCase(TestCase):
+
+    def test_download_survey_idempotent(self):
+        path = os.path.join(settings.BASE_DIR, 'example_surveyresult.tsv')
+        out = io.StringIO()
+        call_command('download_survey', path, '--batch-size', '10', stdout=out)
+        count = SurveyResult.objects.count()
+        self.assertGreater(count, 0)
+        self.assertEqual(OperatingSystem.objects.filter(name='Windows').count(), 1)
+
+        call_command('download_survey', path, stdout=out)
+        self.assertEqual(SurveyResult.objects.count(), count)
+        self.assertIn('Imported 0 of {} rows'.format(count), out.getvalue())
+
+    def call_download_survey(self, directory, lines):
+        path = os.path.join(directory, 'survey.tsv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(['header'] + lines) + '\n')
+        out, err = io.StringIO(), io.StringIO()
+        call_command('download_survey', path, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_download_survey_invalid_rows(self):
+        row = '2020-08-25 22:04:25\tWindows\t{}\t1\t3\t컴퓨터공학부\t2학년\t\t\t'
+        with tempfile.TemporaryDirectory() as directory:
+            out, err = self.call_download_survey(directory, [
+                row.format(3), row.format('x'), row.format(6), 'Windows\t3', row.format(3),
+            ])
+        self.assertIn('Imported 2 of 2 rows (0 already present, 3 invalid)', out)
+        self.assertIn("Skipped line 3: python score 'x' is not one of 1-5", err)
+        self.assertIn("Skipped line 4: python score '6' is not one of 1-5", err)
+        self.assertIn('Skipped line 5: 2 columns, expected 10', err)
+        self.assertEqual(SurveyResult.objects.filter(python=3).count(), 2)
+
+    def test_download_survey_shifted_rows(self):
+        rows = ['2020-08-25 22:04:25\tWindows\t{}\t1\t3\t컴퓨터공학부\t2학년\t\t\t'.format(i) for i in (1, 2, 2)]
+        with tempfile.TemporaryDirectory() as directory:
+            self.call_download_survey(directory, rows)
+            out, err = self.call_download_survey(directory, ['', rows[2], ' {} '.format(rows[0]), rows[1], rows[1]])
+        self.assertIn('Imported 1 of 4 rows (3 already present, 0 invalid)', out)
+        self.assertEqual(SurveyResult.objects.filter(python=2).count(), 3)
+
+
+class ExportSurveyResultTestCase(TestCase):
+
+    def setUp(self):
+        linux = OperatingSystem.objects.create(name='Linux')
+        for i in range(5):
+            SurveyResult.objects.create(os=linux, python=i % 5 + 1, rdb=3, programming=4, major='컴퓨터공학부')
+
+    def test_export_csv(self):
+        response = self.client.get('/api/v1/survey/export/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+        self.assertEqual(rows[0][:3], ['id', 'timestamp', 'os'])
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[1][2], 'Linux')
+        self.assertEqual(rows[1][7], '컴퓨터공학부')
+
+    def test_export_ndjson(self):
+        with patch('survey.export.iterate_rows.__defaults__', (2, )):
+            response = self.client.get('/api/v1/survey/export/?format=ndjson')
+            lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(len(lines), 5)
+        self.assertEqual([json.loads(line)['python'] for line in lines], [1, 2, 3, 4, 5])
@@ -1,10 +1,10 @@
 from django.urls import include, path
-from rest_framework.routers import SimpleRouter
 from survey.views import OperatingSystemViewSet, SurveyResultViewSet
+from waffle_backend.asyncviews import AsyncReadRouter
 
 app_name = 'survey'
 
-router = SimpleRouter()
+router = AsyncReadRouter()
 router.register('survey', SurveyResultViewSet, basename='survey')
 router.register('os', OperatingSystemViewSet, basename='os')
 
@@ -1,28 +1,82 @@
+from django.http import StreamingHttpResponse
 from rest_framework import status, viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
+from survey import stats as survey_stats
+from survey.export import CSVRenderer, NDJSONRenderer, iterate_rows, stream_csv, stream_ndjson
 from survey.serializers import OperatingSystemSerializer, SurveyResultSerializer
 from survey.models import OperatingSystem, SurveyResult
+from user.serializers import prefetch_user_details
+from user.views import get_user_etag
+from waffle_backend import conditional
+from waffle_backend.pagination import KeysetPagination
+from waffle_backend.sparse import SparseFieldsViewMixin
 
 
-class SurveyResultViewSet(viewsets.GenericViewSet):
+class SurveyResultViewSet(SparseFieldsViewMixin, viewsets.GenericViewSet):
     queryset = SurveyResult.objects.all()
     serializer_class = SurveyResultSerializer
     permission_classes = (IsAuthenticated(), )
+    pagination_class = KeysetPagination
+    async_actions = ('list', 'retrieve')
 
     def get_permissions(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in ('list', 'retrieve', 'stats', 'export'):
             return (AllowAny(), )
         return self.permission_classes
 
     def list(self, request):
-        surveys = self.get_queryset().select_related('os', 'user')
-        return Response(self.get_serializer(surveys, many=True).data)
+        surveys = self.get_queryset().order_by('-timestamp', '-id')
+        page = self.paginate_queryset(surveys)
+        if self.expand_user() and self.is_requested('user'):
+            prefetch_user_details(survey.user for survey in page if survey.user)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    def get_queryset(self):
+        related = [name for name in ('os', 'user') if self.is_requested(name)]
+        queryset = super(SurveyResultViewSet, self).get_queryset()
+        return queryset.select_related(*related) if related else queryset
+
+    def get_serializer_context(self):
+        context = super(SurveyResultViewSet, self).get_serializer_context()
+        context['expand'] = self.get_expand()
+        return context
+
+    def get_expand(self):
+        # Embedded users are compact (id, username, email) unless '?expand=user' asks for the full profile.
+        expand = self.request.query_params.get('expand', '')
+        return {field.strip() for field in expand.split(',') if field.strip()}
+
+    def expand_user(self):
+        return 'user' in self.get_expand()
 
     def retrieve(self, request, pk=None):
         survey = self.get_object()
-        return Response(self.get_serializer(survey).data)
+        os = survey.os if self.is_requested('os') else None
+        user = survey.user if self.is_requested('user') else None
+        if user is None:
+            user_etag = None
+        elif self.expand_user():
+            user_etag = get_user_etag(user)
+        else:
+            user_etag = (user.pk, user.username, user.email)
+        etag = self.get_sparse_etag(conditional.make_etag(
+            'survey',
+            survey.pk,
+            survey.timestamp,
+            os and (os.pk, os.name, os.description, os.price),
+            self.expand_user(),
+            user_etag,
+        ))
+        response = conditional.not_modified(request, etag)
+        if response is None:
+            if user is not None and self.expand_user():
+                prefetch_user_details([user])
+            response = Response(self.get_serializer(survey).data)
+            conditional.set_validators(response, etag)
+        return response
 
     def create(self, request):
         data = request.data.copy()
@@ -33,10 +87,24 @@ class SurveyResultViewSet(viewsets.GenericViewSet):
         serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['GET'])
+    def stats(self, request):
+        return Response(survey_stats.summarize(survey_stats.get_cells()))
+
+    @action(detail=False, methods=['GET'], renderer_classes=(CSVRenderer, NDJSONRenderer))
+    def export(self, request):
+        if request.accepted_renderer.format == 'ndjson':
+            response = StreamingHttpResponse(stream_ndjson(iterate_rows()), content_type='application/x-ndjson')
+        else:
+            response = StreamingHttpResponse(stream_csv(iterate_rows()), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="survey.{}"'.format(request.accepted_renderer.format)
+        return response
+
 
 class OperatingSystemViewSet(viewsets.GenericViewSet):
     queryset = OperatingSystem.objects.all()
     serializer_class = OperatingSystemSerializer
+    async_actions = ('list', 'retrieve')
 
     def list(self, request):
         return Response(self.get_serializer(self.get_queryset(), many=True).data)
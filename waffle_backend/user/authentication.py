@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+USER_FIELDS = [field.attname for field in User._meta.concrete_fields]
+TOKEN_FIELDS = [field.attname for field in Token._meta.concrete_fields]
+
+
+class TokenCache(object):
+    # Bounded LRU of token key -> (user row, token row) with a TTL, in front of an optional shared cache.
+    # Rows are kept as plain tuples and rebuilt into fresh instances on every hit, so concurrent requests
+    # never share a mutable User. Other processes only notice an invalidation through the shared tier or
+    # once TIMEOUT expires, which bounds how long a deleted token can still be accepted there.
+
+    def __init__(self, max_size, timeout, alias=None):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.alias = alias
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def get_shared(self):
+        return caches[self.alias] if self.alias else None
+
+    def shared_key(self, key):
+        return 'user:token:{}'.format(key)
+
+    def get(self, key):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires, rows = entry
+                if expires > now:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return rows
+                del self.entries[key]
+
+        shared = self.get_shared()
+        rows = shared.get(self.shared_key(key)) if shared else None
+        with self.lock:
+            if rows is None:
+                self.misses += 1
+            else:
+                self.shared_hits += 1
+        if rows is not None:
+            self.set_local(key, rows)
+        return rows
+
+    def set(self, key, rows):
+        self.set_local(key, rows)
+        shared = self.get_shared()
+        if shared:
+            shared.set(self.shared_key(key), rows, self.timeout)
+
+    def set_local(self, key, rows):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.timeout, rows)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+        shared = self.get_shared()
+        if shared:
+            shared.delete_many([self.shared_key(key) for key in keys])
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.shared_hits = self.misses = 0
+
+    def stats(self):
+        with self.lock:
+            hits, shared_hits, misses, size = self.hits, self.shared_hits, self.misses, len(self.entries)
+        total = hits + shared_hits + misses
+        return {
+            'hits': hits,
+            'shared_hits': shared_hits,
+            'misses': misses,
+            'hit_rate': (hits + shared_hits) / total if total else 0.0,
+            'size': size,
+        }
+
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    global _token_cache
+    if _token_cache is None:
+        with _token_cache_lock:
+            if _token_cache is None:
+                _token_cache = TokenCache(
+                    settings.TOKEN_CACHE['MAX_SIZE'],
+                    settings.TOKEN_CACHE['TIMEOUT'],
+                    settings.TOKEN_CACHE['ALIAS'],
+                )
+    return _token_cache
+
+
+def invalidate(*keys):
+    # Invalidate now and again once the transaction commits, like the seminar cache, so that a
+    # request authenticating concurrently cannot put the old row back.
+    keys = [key for key in keys if key]
+    if keys:
+        get_token_cache().delete(*keys)
+        transaction.on_commit(lambda: get_token_cache().delete(*keys))
+
+
+def invalidate_user(user_id):
+    invalidate(*Token.objects.filter(user_id=user_id).values_list('key', flat=True))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    # Drop-in replacement for TokenAuthentication that answers repeated tokens without a query.
+
+    def authenticate_credentials(self, key):
+        token_cache = get_token_cache()
+        rows = token_cache.get(key)
+        if rows is None:
+            user, token = super(CachedTokenAuthentication, self).authenticate_credentials(key)
+            token_cache.set(key, (
+                user._state.db,
+                tuple(getattr(user, field) for field in USER_FIELDS),
+                tuple(getattr(token, field) for field in TOKEN_FIELDS),
+            ))
+            return user, token
+
+        db, user_values, token_values = rows
+        user = User.from_db(db, USER_FIELDS, user_values)
+        token = Token.from_db(db, TOKEN_FIELDS, token_values)
+        token.user = user
+        return user, token
+
+    @staticmethod
+    def stats():
+        return get_token_cache().stats()
@@ -0,0 +1,11 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    # Django's PBKDF2 hasher with its cost taken from PASSWORD_HASHING['ITERATIONS']. The algorithm
+    # name is unchanged, so existing hashes stay valid and are upgraded on login when the cost changes.
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASHING['ITERATIONS'] or PBKDF2PasswordHasher.iterations
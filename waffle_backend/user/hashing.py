@@ -0,0 +1,105 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class HashingUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many password operations in progress, try again later.'
+    default_code = 'hashing_unavailable'
+
+
+class HashingPool(object):
+    # Runs password hashing on a few dedicated threads, so a burst of signups or logins cannot occupy
+    # every request worker. hashlib releases the GIL while hashing, so requests not touching passwords
+    # keep being served. At most WORKERS + MAX_PENDING operations are admitted at once; the rest are
+    # rejected right away with a 503 instead of queueing without bound.
+
+    def __init__(self, workers, max_pending):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hashing')
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_time = 0.0
+        self.run_time = 0.0
+
+    def admit(self):
+        with self.lock:
+            if self.in_flight >= self.workers + self.max_pending:
+                self.rejected += 1
+                raise HashingUnavailable()
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def run(self, func, *args):
+        self.admit()
+        submitted = time.perf_counter()
+        started = []
+
+        def call():
+            started.append(time.perf_counter())
+            return func(*args)
+
+        try:
+            return self.executor.submit(call).result()
+        finally:
+            finished = time.perf_counter()
+            with self.lock:
+                self.in_flight -= 1
+                self.completed += 1
+                if started:
+                    self.wait_time += started[0] - submitted
+                    self.run_time += finished - started[0]
+
+    def stats(self):
+        with self.lock:
+            completed = self.completed
+            return {
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'in_flight': self.in_flight,
+                'queued': max(self.in_flight - self.workers, 0),
+                'max_in_flight': self.max_in_flight,
+                'completed': completed,
+                'rejected': self.rejected,
+                'mean_wait_ms': self.wait_time / completed * 1000 if completed else 0.0,
+                'mean_run_ms': self.run_time / completed * 1000 if completed else 0.0,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashingPool(settings.PASSWORD_HASHING['WORKERS'], settings.PASSWORD_HASHING['MAX_PENDING'])
+    return _pool
+
+
+def make_password(password):
+    return get_pool().run(hashers.make_password, password)
+
+
+def check_password(user, password):
+    # Verifies on the pool and, when the stored hash uses an outdated hasher or cost, stores a new
+    # hash computed on the pool too. The save itself stays on the request thread and its connection.
+    outdated = []
+    if not get_pool().run(hashers.check_password, password, user.password, outdated.append):
+        return False
+    if outdated:
+        user.password = make_password(password)
+        user.save(update_fields=['password'])
+    return True
@@ -1,14 +1,41 @@
-from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
-from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
 from rest_framework.authtoken.models import Token
+from user import hashing
 from user.models import ParticipantProfile, InstructorProfile
 from seminar.serializers import ParticipantSeminarSerializer, InstructorSeminarSerializer
 from seminar.models import UserSeminar
+from waffle_backend.sparse import SparseFieldsMixin
 
 
-class UserSerializer(serializers.ModelSerializer):
+def get_userseminar_prefetch():
+    return Prefetch(
+        'user_seminar',
+        queryset=UserSeminar.objects.select_related('seminar').order_by('id'),
+        to_attr='prefetched_userseminars',
+    )
+
+
+def get_user_queryset():
+    # Joins both profiles and prefetches every membership with its seminar, so serializing any number
+    # of users with UserSerializer costs two queries in total.
+    return User.objects.select_related('participant', 'instructor').prefetch_related(get_userseminar_prefetch())
+
+
+def prefetch_user_details(users):
+    # Same for users that are already loaded. Profiles that are already cached are not fetched again.
+    prefetch_related_objects(list(users), 'participant', 'instructor', get_userseminar_prefetch())
+
+
+def get_userseminars(user, role):
+    if hasattr(user, 'prefetched_userseminars'):
+        return [userseminar for userseminar in user.prefetched_userseminars if userseminar.role == role]
+    return UserSeminar.objects.filter(user=user, role=role).select_related('seminar').order_by('id')
+
+
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     ROLE_CHOICES = ('participant', 'instructor')
     email = serializers.EmailField(allow_blank=False)
     password = serializers.CharField(write_only=True)
@@ -19,10 +46,11 @@ class UserSerializer(serializers.ModelSerializer):
     participant = serializers.SerializerMethodField()
     instructor = serializers.SerializerMethodField()
     role = serializers.ChoiceField(choices=ROLE_CHOICES, write_only=True)
-    university = serializers.CharField(allow_blank=True, write_only=True, required=False)
+    # Profile fields are validated here once, with the constraints of the profile models.
+    university = serializers.CharField(allow_blank=True, max_length=50, write_only=True, required=False)
     accepted = serializers.NullBooleanField(write_only=True, required=False)
-    company = serializers.CharField(allow_blank=True, write_only=True, required=False)
-    year = serializers.IntegerField(allow_null=True, write_only=True, required=False)
+    company = serializers.CharField(allow_blank=True, max_length=50, write_only=True, required=False)
+    year = serializers.IntegerField(allow_null=True, min_value=0, max_value=32767, write_only=True, required=False)
 
     class Meta:
         model = User
@@ -55,7 +83,7 @@ class UserSerializer(serializers.ModelSerializer):
         return None
 
     def validate_password(self, value):
-        return make_password(value)
+        return hashing.make_password(value)
 
     def validate(self, data):
         first_name = data.get('first_name')
@@ -65,25 +93,8 @@ class UserSerializer(serializers.ModelSerializer):
         if first_name and last_name and not (first_name.isalpha() and last_name.isalpha()):
             raise serializers.ValidationError("First name or last name should not have number.")
 
-        role = data.get('role')
-        serializer = None
-        data_copied = data.copy()
-        if not role:
-            if hasattr(self.instance, 'participant'):
-                data_copied.pop('accepted', None)
-                serializer = ParticipantProfileSerializer(self.instance.participant, data=data_copied, partial=True)
-                serializer.is_valid(raise_exception=True)
-            if hasattr(self.instance, 'instructor'):
-                serializer = InstructorProfileSerializer(self.instance.participant, data=data_copied, partial=True)
-                serializer.is_valid(raise_exception=True)
-        else:
-            data_copied.update(user=None)
-            if role == 'participant':
-                serializer = ParticipantProfileSerializer(data=data_copied)
-            elif role == 'instructor':
-                serializer = InstructorProfileSerializer(data=data_copied)
-            serializer.is_valid(raise_exception=True)
-
+        if data.get('role') == 'participant' and data.get('accepted') is None:
+            raise serializers.ValidationError({'accepted': ["This field is required."]})
         return data
 
     def create(self, validated_data):
@@ -92,33 +103,42 @@ class UserSerializer(serializers.ModelSerializer):
         accepted = validated_data.pop('accepted', None)
         company = validated_data.pop('company', '')
         year = validated_data.pop('year', None)
-        user = super(UserSerializer, self).create(validated_data)
-        Token.objects.create(user=user)
-        if role == 'participant':
-            ParticipantProfile.objects.create(
-                user=user,
-                university=university,
-                accepted=accepted,
-            )
-        elif role == 'instructor':
-            InstructorProfile.objects.create(
-                user=user,
-                company=company,
-                year=year,
-            )
+        # The password was hashed during validation, so the transaction only spans the three inserts.
+        with transaction.atomic():
+            user = User.objects.create(**validated_data)
+            user.auth_token = Token.objects.create(user=user)
+            if role == 'participant':
+                user.participant = ParticipantProfile.objects.create(
+                    user=user,
+                    university=university,
+                    accepted=accepted,
+                )
+            elif role == 'instructor':
+                user.instructor = InstructorProfile.objects.create(
+                    user=user,
+                    company=company,
+                    year=year,
+                )
+        # Mark the missing profile and memberships as loaded so the response is built without reads.
+        for name in ('participant', 'instructor'):
+            descriptor = getattr(User, name)
+            if not descriptor.is_cached(user):
+                descriptor.related.set_cached_value(user, None)
+        user.prefetched_userseminars = []
         return user
 
     def update(self, instance, validated_data):
-        if hasattr(instance, 'participant'):
-            participant = instance.participant
-            participant.university = validated_data.pop('university', participant.university)
-            participant.save()
-        if hasattr(instance, 'instructor'):
-            instructor = instance.instructor
-            instructor.company = validated_data.pop('company', instructor.company)
-            instructor.year = validated_data.pop('year', instructor.year)
-            instructor.save()
-        super(UserSerializer, self).update(instance, validated_data)
+        with transaction.atomic():
+            if hasattr(instance, 'participant'):
+                participant = instance.participant
+                participant.university = validated_data.pop('university', participant.university)
+                participant.save()
+            if hasattr(instance, 'instructor'):
+                instructor = instance.instructor
+                instructor.company = validated_data.pop('company', instructor.company)
+                instructor.year = validated_data.pop('year', instructor.year)
+                instructor.save()
+            return super(UserSerializer, self).update(instance, validated_data)
 
 
 class ParticipantProfileSerializer(serializers.ModelSerializer):
@@ -129,16 +149,13 @@ class ParticipantProfileSerializer(serializers.ModelSerializer):
         model = ParticipantProfile
         fields = (
             'id',
-            'user',
             'university',
             'accepted',
             'seminars',
         )
-        extra_kwargs = {'user': {'write_only': True, 'allow_null': True}}
 
     def get_seminars(self, participant):
-        user = participant.user
-        queryset = UserSeminar.objects.filter(user=user, role='participant')
+        queryset = get_userseminars(participant.user, UserSeminar.PARTICIPANT)
         return ParticipantSeminarSerializer(queryset, many=True).data
 
 
@@ -154,10 +171,19 @@ class InstructorProfileSerializer(serializers.ModelSerializer):
             'charge',
         )
 
-    def get_charge(self, participant):
-        user = participant.user
-        try:
-            queryset = UserSeminar.objects.get(user=user, role='instructor')
-        except ObjectDoesNotExist:
+    def get_charge(self, instructor):
+        charge = list(get_userseminars(instructor.user, UserSeminar.INSTRUCTOR)[:1])
+        if not charge:
             return None
-        return InstructorSeminarSerializer(queryset).data
+        return InstructorSeminarSerializer(charge[0]).data
+
+
+class SimpleUserSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = User
+        fields = (
+            'id',
+            'username',
+            'email',
+        )
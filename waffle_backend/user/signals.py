@@ -0,0 +1,24 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from user import authentication
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    authentication.invalidate(instance.key)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    # Users created or read together with their token (e.g. at signup) do not need to look it up.
+    if User.auth_token.is_cached(instance):
+        token = User.auth_token.related.get_cached_value(instance)
+        if token is not None:
+            authentication.invalidate(token.key)
+        return
+    authentication.invalidate_user(instance.pk)
@@ -1,3 +1,299 @@
-from django.test import TestCase
+import datetime
+import json
+import threading
+from unittest.mock import patch
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from seminar.models import Seminar, UserSeminar
+from user.authentication import get_token_cache
+from user.hashing import HashingPool
+
+
+class UserTestMixin(object):
+
+    def signup(self, username, role='participant', **extra):
+        data = {
+            'username': username,
+            'password': 'password',
+            'email': '{}@mail.com'.format(username),
+            'role': role,
+        }
+        if role == 'participant':
+            data['accepted'] = True
+        data.update(extra)
+        response = self.client.post('/api/v1/user/', json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return User.objects.get(username=username), response.json()['token']
+
+    def auth(self, token):
+        return {'HTTP_AUTHORIZATION': 'Token {}'.format(token)}
+
+
+class GetUserTestCase(UserTestMixin, TestCase):
+
+    def setUp(self):
+        self.user, self.token = self.signup('participant', university='SNU')
+
+    def test_get_user_not_modified(self):
+        response = self.client.get('/api/v1/user/me/', **self.auth(self.token))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        response = self.client.get('/api/v1/user/me/', HTTP_IF_NONE_MATCH=etag, **self.auth(self.token))
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+        response = self.client.put(
+            '/api/v1/user/me/',
+            json.dumps({'university': 'KAIST'}),
+            content_type='application/json',
+            **self.auth(self.token)
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get('/api/v1/user/me/', HTTP_IF_NONE_MATCH=etag, **self.auth(self.token))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['participant']['university'], 'KAIST')
+
+    def test_get_other_user_not_modified(self):
+        other, token = self.signup('instructor', role='instructor')
+        url = '/api/v1/user/{}/'.format(other.pk)
+        etag = self.client.get(url, **self.auth(self.token))['ETag']
+        # The user row and the validators only, none of the profile and membership queries.
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, **self.auth(self.token))
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(self.client.get('/api/v1/user/abc/', **self.auth(self.token)).status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+
+class UserDetailQueriesTestCase(UserTestMixin, TestCase):
+
+    def setUp(self):
+        self.user, self.token = self.signup('participant', university='SNU')
+        self.instructor, token = self.signup('instructor', role='instructor', company='Waffle')
+
+    def enroll(self, count):
+        for i in range(count):
+            seminar = Seminar.objects.create(name='seminar{}'.format(i), capacity=10, count=5,
+                                             time=datetime.time(14, 0), online=True)
+            UserSeminar.objects.create(user=self.user, seminar=seminar, role=UserSeminar.PARTICIPANT)
+        UserSeminar.objects.get_or_create(user=self.instructor, role=UserSeminar.INSTRUCTOR, defaults={'seminar': seminar})
+
+    def count_queries(self, method, path, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(
+                path, json.dumps(data) if data else None, content_type='application/json', **self.auth(self.token)
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json(), len(queries)
+
+    def test_user_detail_queries(self):
+        requests = (
+            ('get', '/api/v1/user/me/', None),
+            ('get', '/api/v1/user/{}/'.format(self.instructor.id), None),
+            ('put', '/api/v1/user/me/', {'university': 'KAIST'}),
+            ('put', '/api/v1/user/login/', {'username': 'participant', 'password': 'password'}),
+        )
+        self.enroll(1)
+        for request in requests:
+            self.count_queries(*request)
+        counts = [self.count_queries(*request)[1] for request in requests]
+        self.enroll(5)
+        for request, count in zip(requests, counts):
+            data, queries = self.count_queries(*request)
+            self.assertEqual(queries, count, request)
+        data, queries = self.count_queries('get', '/api/v1/user/me/')
+        self.assertEqual(len(data['participant']['seminars']), 6)
+        self.assertEqual(data['participant']['university'], 'KAIST')
+        data, queries = self.count_queries('get', '/api/v1/user/{}/'.format(self.instructor.id))
+        self.assertEqual(data['instructor']['charge']['name'], 'seminar0')
+
+
+class CreateUserTestCase(UserTestMixin, TestCase):
+
+    def test_create_user(self):
+        with CaptureQueriesContext(connection) as queries:
+            user, token = self.signup('participant', university='SNU')
+        self.assertEqual(user.participant.university, 'SNU')
+        self.assertEqual(user.auth_token.key, token)
+        # The response is built from the inserted rows, so no profile, token or membership is read back.
+        reads = [query['sql'] for query in queries if query['sql'].startswith('SELECT')]
+        self.assertFalse([sql for sql in reads if 'profile' in sql or 'authtoken' in sql or 'seminar' in sql], reads)
+
+    def test_create_user_atomic(self):
+        with patch('user.serializers.ParticipantProfile.objects.create', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.client.post('/api/v1/user/', json.dumps({
+                    'username': 'participant', 'password': 'password', 'email': 'participant@mail.com',
+                    'role': 'participant', 'accepted': True,
+                }), content_type='application/json')
+        self.assertFalse(User.objects.filter(username='participant').exists())
+        self.assertFalse(Token.objects.exists())
+
+    def test_create_user_invalid_profile(self):
+        for data in ({'role': 'participant'}, {'role': 'instructor', 'year': -1}):
+            data.update(username='user', password='password', email='user@mail.com')
+            response = self.client.post('/api/v1/user/', json.dumps(data), content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(User.objects.exists())
+
+    def test_become_participant(self):
+        user, token = self.signup('instructor', role='instructor')
+        response = self.client.post('/api/v1/user/participant/', json.dumps({'university': 'SNU', 'accepted': True}),
+                                    content_type='application/json', **self.auth(token))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['participant']['university'], 'SNU')
+        self.assertIsNotNone(response.json()['instructor'])
+        response = self.client.post('/api/v1/user/participant/', json.dumps({'accepted': True}),
+                                    content_type='application/json', **self.auth(token))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PasswordHashingTestCase(UserTestMixin, TestCase):
+
+    def login(self, password='password'):
+        return self.client.put('/api/v1/user/login/', json.dumps({'username': 'participant', 'password': password}),
+                               content_type='application/json')
+
+    @override_settings(PASSWORD_HASHERS=settings.PASSWORD_HASHER_PROFILES['fast'])
+    def test_rehash_on_login(self):
+        user, token = self.signup('participant')
+        user.password = make_password('password', hasher='pbkdf2_sha256')
+        user.save()
+        self.assertEqual(self.login('wrong').status_code, status.HTTP_403_FORBIDDEN)
+        self.assertTrue(User.objects.get(pk=user.pk).password.startswith('pbkdf2_sha256$'))
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+        self.assertTrue(User.objects.get(pk=user.pk).password.startswith('md5$'))
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+    def test_admission_control(self):
+        self.signup('participant')
+        pool = HashingPool(workers=1, max_pending=0)
+        started, release = threading.Event(), threading.Event()
+        thread = threading.Thread(target=pool.run, args=(lambda: started.set() or release.wait(5), ))
+        thread.start()
+        started.wait(5)
+        with patch('user.hashing.get_pool', return_value=pool):
+            response = self.login()
+        release.set()
+        thread.join()
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(pool.stats()['rejected'], 1)
+        self.assertEqual(pool.stats()['completed'], 1)
+        self.assertEqual(pool.stats()['in_flight'], 0)
+
+
+class UserSparseFieldsTestCase(UserTestMixin, TestCase):
+
+    def setUp(self):
+        self.user, self.token = self.signup('instructor', role='instructor', company='Waffle')
+
+    def test_get_user_fields(self):
+        self.client.get('/api/v1/user/me/', **self.auth(self.token))
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/v1/user/me/?fields=id,username', **self.auth(self.token))
+        self.assertEqual(response.json(), {'id': self.user.id, 'username': 'instructor'})
+        response = self.client.get('/api/v1/user/me/?omit=participant', **self.auth(self.token))
+        self.assertEqual(response.json()['instructor']['company'], 'Waffle')
+        self.assertNotIn('participant', response.json())
+
+
+class BatchUserTestCase(UserTestMixin, TestCase):
+
+    def setUp(self):
+        self.user, self.token = self.signup('participant')
+        self.instructor, token = self.signup('instructor', role='instructor')
+
+    def get_batch(self, ids):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/user/?ids={}'.format(','.join(map(str, ids))), **self.auth(self.token))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json(), len(queries)
+
+    def test_batch_user(self):
+        self.get_batch([self.user.id])
+        data, one = self.get_batch([self.user.id])
+        data, many = self.get_batch([self.instructor.id, 0, self.user.id])
+        self.assertEqual(one, many)
+        self.assertEqual([user['username'] for user in data['results']], ['instructor', 'participant'])
+        self.assertEqual(data['missing'], [0])
+        self.assertIsNone(data['results'][0]['participant'])
+
+    def test_batch_user_requires_ids(self):
+        response = self.client.get('/api/v1/user/', **self.auth(self.token))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class EnrollmentChangeFeedTestCase(UserTestMixin, TestCase):
+
+    def setUp(self):
+        self.user, self.token = self.signup('participant')
+        self.seminars = [
+            Seminar.objects.create(name=name, capacity=10, count=5, time=datetime.time(14, 0), online=True)
+            for name in ('first', 'second')
+        ]
+        for seminar in self.seminars:
+            UserSeminar.objects.create(user=self.user, seminar=seminar, role=UserSeminar.PARTICIPANT)
+
+    def test_enrollment_changes(self):
+        data = self.client.get('/api/v1/user/me/seminars/', **self.auth(self.token)).json()
+        self.assertEqual([enrollment['name'] for enrollment in data['results']], ['first', 'second'])
+        self.assertEqual(data['deleted'], [])
+
+        since = timezone.now()
+        self.client.delete('/api/v1/seminar/{}/user/'.format(self.seminars[0].id), **self.auth(self.token))
+        UserSeminar.objects.filter(seminar=self.seminars[1]).delete()
+        data = self.client.get(
+            '/api/v1/user/me/seminars/', {'updated_since': since.isoformat()}, **self.auth(self.token)
+        ).json()
+        self.assertEqual(len(data['results']), 1)
+        self.assertFalse(data['results'][0]['is_active'])
+        self.assertEqual(data['results'][0]['role'], 'participant')
+        self.assertEqual(data['deleted'], [self.seminars[1].id])
+
+        response = self.client.get('/api/v1/user/{}/seminars/'.format(self.user.id), **self.auth(self.token))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class CachedTokenAuthenticationTestCase(UserTestMixin, TestCase):
+
+    def setUp(self):
+        get_token_cache().clear()
+        self.user, self.token = self.signup('participant')
+
+    def get_token_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/user/me/', **self.auth(self.token))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len([query for query in queries if 'authtoken_token' in query['sql']])
+
+    def test_token_cached(self):
+        self.assertEqual(self.get_token_queries(), 1)
+        self.assertEqual(self.get_token_queries(), 0)
+        stats = get_token_cache().stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_token_invalidated(self):
+        self.get_token_queries()
+        self.client.post('/api/v1/user/logout/', **self.auth(self.token))
+        self.assertEqual(self.get_token_queries(), 1)
+
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get('/api/v1/user/me/', **self.auth(self.token))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_deleted(self):
+        self.get_token_queries()
+        Token.objects.filter(key=self.token).delete()
+        response = self.client.get('/api/v1/user/me/', **self.auth(self.token))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
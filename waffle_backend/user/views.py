@@ -1,16 +1,49 @@
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 from django.db import IntegrityError
+from django.db.models import Count, Max
 from rest_framework import status, viewsets
 from rest_framework.authtoken.models import Token
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
-from user.serializers import UserSerializer, ParticipantProfileSerializer
-
-
-class UserViewSet(viewsets.GenericViewSet):
+from seminar.models import Tombstone, UserSeminar
+from seminar.serializers import EnrollmentSerializer
+from user import authentication
+from user.serializers import UserSerializer, ParticipantProfileSerializer, get_user_queryset, prefetch_user_details
+from waffle_backend import conditional
+from waffle_backend.batch import get_batch_ids, order_batch
+from waffle_backend.changes import change_feed, get_watermark
+from waffle_backend.sparse import SparseFieldsViewMixin
+
+
+def get_user_etag(user, related=True):
+    # User rows carry no modification time, so only an ETag (no Last-Modified) is derived for them.
+    # Profiles and seminars only need to be looked at when they are part of the representation.
+    latest = {}
+    if related:
+        latest = User.objects.filter(pk=user.pk).aggregate(
+            participant=Max('participant__updated_at'),
+            instructor=Max('instructor__updated_at'),
+            userseminar=Max('user_seminar__updated_at'),
+            seminar=Max('user_seminar__seminar__updated_at'),
+            userseminars=Count('user_seminar'),
+        )
+    return conditional.make_etag(
+        'user',
+        user.pk,
+        user.username,
+        user.email,
+        user.first_name,
+        user.last_name,
+        user.last_login,
+        sorted(latest.items()),
+    )
+
+
+class UserViewSet(SparseFieldsViewMixin, viewsets.GenericViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = (IsAuthenticated(), )
@@ -20,6 +53,21 @@ class UserViewSet(viewsets.GenericViewSet):
             return (AllowAny(), )
         return self.permission_classes
 
+    def is_detailed(self):
+        return self.is_requested('participant') or self.is_requested('instructor')
+
+    def get_queryset(self):
+        if self.is_detailed():
+            return get_user_queryset()
+        return super(UserViewSet, self).get_queryset()
+
+    def get_detailed_user(self, user):
+        # Users coming from authentication carry no profiles, so they are loaded again together with
+        # their profiles and memberships when those are part of the representation.
+        if not self.is_detailed():
+            return user
+        return self.get_queryset().get(pk=user.pk)
+
     def create(self, request):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -46,7 +94,7 @@ class UserViewSet(viewsets.GenericViewSet):
         if user:
             login(request, user)
 
-            data = self.get_serializer(user).data
+            data = self.get_serializer(self.get_detailed_user(user)).data
             token, created = Token.objects.get_or_create(user=user)
             data['token'] = token.key
             return Response(data)
@@ -55,18 +103,53 @@ class UserViewSet(viewsets.GenericViewSet):
 
     @action(detail=False, methods=['POST'])
     def logout(self, request):
+        if request.auth is not None:
+            authentication.invalidate(request.auth.key)
         logout(request)
         return Response()
 
+    def list(self, request):
+        try:
+            ids = get_batch_ids(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if ids is None:
+            return Response({"error": "ids are required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        users, missing = order_batch(self.get_queryset().filter(id__in=ids), ids)
+        return Response({
+            'results': self.get_serializer(users, many=True).data,
+            'missing': missing,
+        })
+
+    def get_user(self):
+        # The user row, with its profiles joined when they are requested. That is all the validators
+        # need; memberships are only prefetched once the ETag did not match.
+        queryset = User.objects.all()
+        if self.is_detailed():
+            queryset = queryset.select_related('participant', 'instructor')
+        user = get_object_or_404(queryset, pk=self.kwargs['pk'])
+        self.check_object_permissions(self.request, user)
+        return user
+
     def retrieve(self, request, pk=None):
-        user = request.user if pk == 'me' else self.get_object()
-        return Response(self.get_serializer(user).data)
+        user = request.user if pk == 'me' else self.get_user()
+        etag = self.get_sparse_etag(get_user_etag(user, related=self.is_detailed()))
+        response = conditional.not_modified(request, etag)
+        if response is None:
+            if pk == 'me':
+                user = self.get_detailed_user(user)
+            elif self.is_detailed():
+                prefetch_user_details([user])
+            response = Response(self.get_serializer(user).data)
+            conditional.set_validators(response, etag)
+        return response
 
     def update(self, request, pk=None):
         if pk != 'me':
             return Response({"error": "Can't update other Users information"}, status=status.HTTP_403_FORBIDDEN)
 
-        user = request.user
+        user = self.get_detailed_user(request.user)
         data = request.data.copy()
         data.pop('role', '')
         serializer = self.get_serializer(user, data=data, partial=True)
@@ -76,15 +159,33 @@ class UserViewSet(viewsets.GenericViewSet):
 
     @action(detail=False, methods=['POST'])
     def participant(self, request):
-        user = request.user
+        user = self.get_detailed_user(request.user)
         if hasattr(user, 'participant'):
             return Response({"error": "Already a participant"}, status=status.HTTP_400_BAD_REQUEST)
         data = request.data.copy()
-        data.update(user=user.pk)
         if data.get('accepted', '') == '':
             data.pop('accepted', '')
         serializer = ParticipantProfileSerializer(data=data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
-        user.refresh_from_db()
+        try:
+            user.participant = serializer.save(user=user)
+        except IntegrityError:
+            return Response({"error": "Already a participant"}, status=status.HTTP_400_BAD_REQUEST)
         return Response(self.get_serializer(user).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['GET'])
+    def seminars(self, request, pk=None):
+        if pk != 'me':
+            return Response({"error": "Can't read other Users enrollments"}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            since = get_watermark(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return change_feed(
+            request,
+            UserSeminar.objects.filter(user=request.user).select_related('seminar'),
+            Tombstone.objects.filter(kind=Tombstone.USERSEMINAR, owner_id=request.user.pk),
+            lambda page: EnrollmentSerializer(page, many=True).data,
+            since,
+            key='seminar_id',
+        )
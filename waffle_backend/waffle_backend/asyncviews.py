@@ -0,0 +1,78 @@
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.routers import SimpleRouter
+
+# Django 3.1 has no async ORM and DRF views are synchronous, so "async" read views hand the whole
+# view, queries and rendering included, to a bounded pool of threads. The event loop stays free while
+# they run, and WORKERS bounds the database connections a process can open. Writes keep going through
+# Django's single thread-sensitive thread, as they would for any sync view under ASGI.
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=settings.ASYNC_VIEWS['WORKERS'],
+                                               thread_name_prefix='read')
+    return _executor
+
+
+def run_read(view, request, *args, **kwargs):
+    # Runs on a pool thread, which owns its connections; request_started/finished only clean up the
+    # connections of the thread they are sent from.
+    close_old_connections()
+    try:
+        with ExitStack() as stack:
+            metrics = getattr(request, 'metrics', None)
+            if metrics is not None:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_read_view(view):
+    # Wraps a sync view into a coroutine: safe methods run on the read pool, others stay thread-sensitive.
+    write = sync_to_async(view, thread_sensitive=True)
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return await write(request, *args, **kwargs)
+        read = sync_to_async(run_read, thread_sensitive=False, executor=get_executor())
+        return await read(view, request, *args, **kwargs)
+
+    return wrapper
+
+
+class AsyncReadRouter(SimpleRouter):
+    # Serves the routes of a viewset's `async_actions` with async_read_view when ASYNC_VIEWS is enabled.
+
+    def __init__(self, *args, **kwargs):
+        self.async_views = kwargs.pop('async_views', settings.ASYNC_VIEWS['ENABLED'])
+        super(AsyncReadRouter, self).__init__(*args, **kwargs)
+
+    def get_urls(self):
+        urls = super(AsyncReadRouter, self).get_urls()
+        if not self.async_views:
+            return urls
+        for url in urls:
+            async_actions = getattr(url.callback.cls, 'async_actions', ())
+            if set(url.callback.actions.values()) & set(async_actions):
+                url.callback = async_read_view(url.callback)
+        return urls
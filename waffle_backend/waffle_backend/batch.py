@@ -0,0 +1,31 @@
+IDS_PARAM = 'ids'
+MAX_BATCH_SIZE = 100
+
+
+def get_batch_ids(request):
+    # Parses '?ids=1,2,3' keeping the requested order; returns None when the parameter is absent
+    # and raises ValueError with a message for the client when it is malformed or too long.
+    value = request.query_params.get(IDS_PARAM)
+    if value is None:
+        return None
+    ids = []
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if not part.isdigit():
+            raise ValueError("ids should be a comma separated list of integers")
+        pk = int(part)
+        if pk not in ids:
+            ids.append(pk)
+    if not ids:
+        raise ValueError("ids should not be empty")
+    if len(ids) > MAX_BATCH_SIZE:
+        raise ValueError("Up to {} ids can be requested at once".format(MAX_BATCH_SIZE))
+    return ids
+
+
+def order_batch(objects, ids):
+    # Returns the found objects in the requested order along with the ids that do not exist.
+    found = {obj.pk: obj for obj in objects}
+    return [found[pk] for pk in ids if pk in found], [pk for pk in ids if pk not in found]
@@ -0,0 +1,49 @@
+import datetime
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.response import Response
+
+from waffle_backend.pagination import KeysetPagination
+
+WATERMARK_PARAM = 'updated_since'
+# Rows are stamped when saved but only become visible on commit, so the returned watermark trails
+# the clock by more than any write transaction should take. Rows inside that margin are sent again,
+# which clients absorb by upserting.
+WATERMARK_LAG = datetime.timedelta(seconds=5)
+
+
+def get_watermark(request):
+    # Returns None when the parameter is absent and raises ValueError when it is not a timestamp.
+    value = request.query_params.get(WATERMARK_PARAM)
+    if value is None:
+        return None
+    watermark = parse_datetime(value)
+    if watermark is None:
+        raise ValueError("updated_since should be an ISO 8601 timestamp")
+    if timezone.is_naive(watermark):
+        watermark = timezone.make_aware(watermark, timezone.utc)
+    return watermark
+
+
+def change_feed(request, queryset, tombstones, serialize, since, key='id'):
+    # Pages through the rows updated at or after `since` in (updated_at, id) order. Deletions are
+    # reported on the last page as values of `key`, leaving out rows that exist again, and clients
+    # keep the watermark of the last page for their next sync.
+    watermark = timezone.now() - WATERMARK_LAG
+    changed = queryset if since is None else queryset.filter(updated_at__gte=since)
+    paginator = KeysetPagination()
+    page = paginator.paginate_queryset(changed.order_by('updated_at', 'id'), request)
+    data = {
+        'results': serialize(page),
+        'next': paginator.get_next_link(),
+        'watermark': watermark.isoformat(),
+    }
+    if data['next'] is None:
+        deleted = []
+        if since is not None:
+            deleted = set(tombstones.filter(deleted_at__gte=since).values_list('object_id', flat=True))
+            if deleted:
+                deleted -= set(queryset.filter(**{'{}__in'.format(key): deleted}).values_list(key, flat=True))
+        data['deleted'] = sorted(deleted)
+    return Response(data)
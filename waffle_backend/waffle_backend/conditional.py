@@ -0,0 +1,38 @@
+import calendar
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5(repr(parts).encode('utf-8')).hexdigest())
+
+
+def timestamp(value):
+    if value is None:
+        return None
+    return calendar.timegm(value.utctimetuple())
+
+
+def not_modified(request, etag, last_modified=None):
+    # Returns a 304 response when the client's validators still match, otherwise None.
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp(last_modified))
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def conditional_response(request, data, etag, last_modified=None):
+    response = not_modified(request, etag, last_modified)
+    if response is None:
+        response = Response(data)
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(timestamp(last_modified))
@@ -0,0 +1,63 @@
+import threading
+import time
+
+FIELDS = ('connects', 'connect_time', 'reuses', 'health_checks', 'health_check_failures')
+
+_stats = dict.fromkeys(FIELDS, 0)
+_stats_lock = threading.Lock()
+
+
+def record(**values):
+    with _stats_lock:
+        for field, value in values.items():
+            _stats[field] += value
+
+
+def stats():
+    with _stats_lock:
+        values = dict(_stats)
+    uses = values['connects'] + values['reuses']
+    values['connect_time'] *= 1000
+    values['mean_connect_time'] = values['connect_time'] / values['connects'] if values['connects'] else 0.0
+    values['reuse_rate'] = values['reuses'] / uses if uses else 0.0
+    return values
+
+
+def reset():
+    with _stats_lock:
+        _stats.update(dict.fromkeys(FIELDS, 0))
+
+
+class ConnectionMetricsMixin(object):
+    # Mixed into the database backends under waffle_backend.db. Counts new connections and their
+    # connect time, and requests that reuse a persistent connection (CONN_MAX_AGE). With
+    # CONN_HEALTH_CHECKS, a reused connection is pinged before its first use in a request and
+    # replaced if the server dropped it, like Django 4.1 does.
+
+    def __init__(self, *args, **kwargs):
+        super(ConnectionMetricsMixin, self).__init__(*args, **kwargs)
+        self.checked = False
+
+    def connect(self):
+        start = time.perf_counter()
+        super(ConnectionMetricsMixin, self).connect()
+        record(connects=1, connect_time=time.perf_counter() - start)
+        self.checked = True
+
+    def ensure_connection(self):
+        if self.connection is not None and not self.checked:
+            self.checked = True
+            # Inside an atomic block the connection is in use already, so it is left alone.
+            if self.settings_dict.get('CONN_HEALTH_CHECKS') and not self.in_atomic_block:
+                usable = self.is_usable()
+                record(health_checks=1, health_check_failures=0 if usable else 1)
+                if not usable:
+                    self.close()
+            if self.connection is not None:
+                record(reuses=1)
+        super(ConnectionMetricsMixin, self).ensure_connection()
+
+    def close_if_unusable_or_obsolete(self):
+        # Called when a request starts and finishes; the next use starts a new request's checks.
+        super(ConnectionMetricsMixin, self).close_if_unusable_or_obsolete()
+        self.checked = False
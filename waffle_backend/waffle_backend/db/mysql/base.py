@@ -0,0 +1,7 @@
+from django.db.backends.mysql import base
+
+from waffle_backend.db import ConnectionMetricsMixin
+
+
+class DatabaseWrapper(ConnectionMetricsMixin, base.DatabaseWrapper):
+    pass
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from seminar import cache as seminar_cache
+from user import hashing
+from user.authentication import CachedTokenAuthentication
+from waffle_backend import db
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('queries', 'db_time', 'serializer_time', 'render_time', 'total_time', 'size')
+
+_endpoints = {}
+_endpoints_lock = threading.Lock()
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class RequestRecord(object):
+    # Installed as an execute wrapper on every connection for the duration of one request.
+
+    def __init__(self):
+        self.key = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.view_start = None
+        self.view_end = None
+        self.view_db_start = 0.0
+        self.view_db_end = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+def get_view_key(view_func, request):
+    # DRF views carry their class, and viewsets the mapping of HTTP methods to actions.
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return None
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return '{}.{}'.format(cls.__name__, action)
+
+
+def record(key, values):
+    with _endpoints_lock:
+        endpoint = _endpoints.get(key)
+        if endpoint is None:
+            endpoint = _endpoints[key] = {
+                'count': 0,
+                'total': dict.fromkeys(FIELDS, 0),
+                'max': dict.fromkeys(FIELDS, 0),
+            }
+        endpoint['count'] += 1
+        for field in FIELDS:
+            endpoint['total'][field] += values[field]
+            endpoint['max'][field] = max(endpoint['max'][field], values[field])
+
+
+def snapshot():
+    with _endpoints_lock:
+        return {
+            key: {
+                'count': endpoint['count'],
+                'mean': {field: endpoint['total'][field] / endpoint['count'] for field in FIELDS},
+                'max': dict(endpoint['max']),
+            }
+            for key, endpoint in sorted(_endpoints.items())
+        }
+
+
+def reset():
+    with _endpoints_lock:
+        _endpoints.clear()
+
+
+class RequestMetricsMiddleware(object):
+    # Times are in milliseconds. serializer_time is the Python time spent in the view outside of the
+    # database, which for these views is almost entirely serialization. Streamed bodies are produced
+    # after the middleware returns, so their size and queries are not counted. Under ASGI the middleware
+    # runs on the event loop, and only queries of views served by waffle_backend.asyncviews are counted.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Marks the instance as a coroutine function, so Django calls it without a thread hop.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not settings.REQUEST_METRICS['ENABLED']:
+            return self.get_response(request)
+
+        request.metrics = metrics = RequestRecord()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics))
+            response = self.get_response(request)
+        return self.finish(request, response, start)
+
+    async def __acall__(self, request):
+        if not settings.REQUEST_METRICS['ENABLED']:
+            return await self.get_response(request)
+
+        request.metrics = RequestRecord()
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        return self.finish(request, response, start)
+
+    def finish(self, request, response, start):
+        config = settings.REQUEST_METRICS
+        metrics = request.metrics
+        end = time.perf_counter()
+
+        if metrics.key is None:
+            return response
+        if metrics.view_end is None:
+            metrics.view_end, metrics.view_db_end = end, metrics.db_time
+        view_db_time = metrics.view_db_end - metrics.view_db_start
+        values = {
+            'queries': metrics.queries,
+            'db_time': metrics.db_time * 1000,
+            'serializer_time': max(metrics.view_end - metrics.view_start - view_db_time, 0) * 1000,
+            'render_time': (end - metrics.view_end) * 1000,
+            'total_time': (end - start) * 1000,
+            'size': 0 if response.streaming else len(response.content),
+        }
+        record(metrics.key, values)
+
+        if config['HEADERS']:
+            response['X-Query-Count'] = metrics.queries
+            response['Server-Timing'] = ', '.join(
+                '{};dur={:.1f}'.format(name, values['{}_time'.format(name)])
+                for name in ('db', 'serializer', 'render', 'total')
+            )
+
+        budget = config['BUDGETS'].get(metrics.key)
+        if budget is not None and metrics.queries > budget:
+            message = '{} ran {} queries, its budget is {}'.format(metrics.key, metrics.queries, budget)
+            if config['ON_BUDGET_EXCEEDED'] == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = getattr(request, 'metrics', None)
+        if metrics is not None:
+            metrics.key = get_view_key(view_func, request)
+            metrics.view_start = time.perf_counter()
+            metrics.view_db_start = metrics.db_time
+
+    def process_template_response(self, request, response):
+        # Called once the view returned and before the response is rendered.
+        metrics = getattr(request, 'metrics', None)
+        if metrics is not None:
+            metrics.view_end = time.perf_counter()
+            metrics.view_db_end = metrics.db_time
+        return response
+
+
+class MetricsView(APIView):
+    permission_classes = (IsAdminUser, )
+
+    def get(self, request):
+        return Response({
+            'endpoints': snapshot(),
+            'seminar_cache': seminar_cache.stats(),
+            'token_cache': CachedTokenAuthentication.stats(),
+            'password_hashing': hashing.get_pool().stats(),
+            'database': db.stats(),
+        })
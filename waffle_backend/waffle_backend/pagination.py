@@ -0,0 +1,92 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    # The queryset must be ordered by (timestamp field, 'id'), both ascending or both descending.
+    # Pages are fetched with a range condition on that pair instead of an OFFSET.
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        field, reverse = self.get_ordering(queryset)
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            value, pk = cursor
+            if reverse:
+                queryset = queryset\
+                    .filter(**{'{}__lte'.format(field): value})\
+                    .filter(Q(**{'{}__lt'.format(field): value}) | Q(id__lt=pk))
+            else:
+                queryset = queryset\
+                    .filter(**{'{}__gte'.format(field): value})\
+                    .filter(Q(**{'{}__gt'.format(field): value}) | Q(id__gt=pk))
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.has_next:
+            last = results[-1]
+            self.next_position = (getattr(last, field), last.id)
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, queryset):
+        ordering = queryset.query.order_by
+        assert len(ordering) == 2 and ordering[1].lstrip('-') == 'id', (
+            'KeysetPagination requires the queryset to be ordered by (field, id).'
+        )
+        field = ordering[0]
+        return field.lstrip('-'), field.startswith('-')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii'))
+            value = parse_datetime(value)
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk
+
+    def encode_cursor(self, position):
+        value, pk = position
+        encoded = json.dumps([value.isoformat(), pk]).encode('ascii')
+        return base64.urlsafe_b64encode(encoded).decode('ascii')
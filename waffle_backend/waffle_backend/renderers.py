@@ -0,0 +1,53 @@
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# DRF's encoder already knows how to turn lazy strings, decimals, querysets, generators and the like
+# into JSON types; it is reused for whatever the fast encoders do not handle natively.
+encoder = encoders.JSONEncoder()
+
+
+class FastJSONRenderer(JSONRenderer):
+    # Same output as JSONRenderer, produced by orjson when it is installed. Pretty printed output
+    # (e.g. for the browsable API) and anything orjson rejects fall back to the stdlib renderer.
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super(FastJSONRenderer, self).render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super(FastJSONRenderer, self).render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=encoder.default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            return super(FastJSONRenderer, self).render(data, accepted_media_type, renderer_context)
+        # Like JSONRenderer, escape U+2028 and U+2029 so the output stays a strict JavaScript subset.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    # Binary alternative for internal clients, enabled with MSGPACK_API=true.
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImproperlyConfigured("MessagePackRenderer requires the 'msgpack' package")
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encoder.default, use_bin_type=True)
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    # Applies what TESTING turns on to every 'manage.py test' run, without the environment variable:
+    # requests over their query budget fail instead of being logged, and passwords use cheap hashes.
+
+    def setup_test_environment(self, **kwargs):
+        super(TestRunner, self).setup_test_environment(**kwargs)
+        self.overrides = override_settings(
+            REQUEST_METRICS=dict(settings.REQUEST_METRICS, ON_BUDGET_EXCEEDED='raise'),
+            PASSWORD_HASHERS=settings.PASSWORD_HASHER_PROFILES['fast'],
+        )
+        self.overrides.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.overrides.disable()
+        super(TestRunner, self).teardown_test_environment(**kwargs)
@@ -26,6 +26,11 @@ SECRET_KEY = '0^k@b1ln%g7l_*6xr*&5&vhgp7r$i&n-db#_!(8*a$n2y1hf4='
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 DEBUG_TOOLBAR = os.getenv('DEBUG_TOOLBAR') in ('true', 'True')
+MSGPACK_API = os.getenv('MSGPACK_API') in ('true', 'True')
+# With TESTING=true, query budgets fail requests and passwords use the cheap 'fast' hasher profile.
+# 'manage.py test' applies both through TEST_RUNNER; set TESTING for other test runners.
+TESTING = os.getenv('TESTING') in ('true', 'True')
+TEST_RUNNER = 'waffle_backend.runner.TestRunner'
 
 ALLOWED_HOSTS = []
 
@@ -44,9 +49,11 @@ INSTALLED_APPS = [
     'survey.apps.SurveyConfig',
     'user.apps.UserConfig',
     'seminar.apps.SeminarConfig',
+    'benchmark.apps.BenchmarkConfig',
 ]
 
 MIDDLEWARE = [
+    'waffle_backend.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,10 +65,23 @@ MIDDLEWARE = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
-    )
+        'user.authentication.CachedTokenAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': [
+        'waffle_backend.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'waffle_backend.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+if MSGPACK_API:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('waffle_backend.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].append('waffle_backend.parsers.MessagePackParser')
+
 if DEBUG_TOOLBAR:
     INSTALLED_APPS.append('debug_toolbar')
     MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
@@ -91,17 +111,116 @@ WSGI_APPLICATION = 'waffle_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
 
+# DB_ENGINE is 'mysql' or 'sqlite3'; both backends live in waffle_backend.db and record connect and reuse
+# metrics. Connections are kept for DB_CONN_MAX_AGE seconds (0 closes them after every request) and, with
+# DB_CONN_HEALTH_CHECKS, pinged before being reused by a new request.
+DB_ENGINE = os.getenv('DB_ENGINE', 'mysql')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'HOST': 'localhost',
-        'PORT': 3306,
-        'NAME': 'waffle_backend_assignment_2',
-        'USER': 'waffle-backend',
-        'PASSWORD': 'seminar',
+        'ENGINE': 'waffle_backend.db.{}'.format(DB_ENGINE),
+        'HOST': os.getenv('DB_HOST', 'localhost'),
+        'PORT': int(os.getenv('DB_PORT', 3306)),
+        'NAME': os.getenv('DB_NAME', 'waffle_backend_assignment_2'),
+        'USER': os.getenv('DB_USER', 'waffle-backend'),
+        'PASSWORD': os.getenv('DB_PASSWORD', 'seminar'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'true') in ('true', 'True'),
+        'OPTIONS': {},
+    }
+}
+
+if DB_ENGINE == 'mysql':
+    DATABASES['default']['OPTIONS'] = {
+        'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 5)),
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
     }
 }
 
+# Seminar details and lists are cached for TIMEOUT seconds and invalidated on writes. The default
+# LocMemCache is private to each process: with several workers, the others keep serving stale
+# seminars until TIMEOUT expires. Run them against a shared cache, e.g. CACHE_BACKEND=
+# django.core.cache.backends.memcached.PyLibMCCache and CACHE_LOCATION=127.0.0.1:11211.
+SEMINAR_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': 300,
+}
+
+SURVEY_STATS_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': 600,
+}
+
+# Per-request query counts and timings, aggregated by 'ViewSet.action' and served at /api/v1/metrics/.
+# A request running more queries than its endpoint's budget is logged, or fails when testing.
+REQUEST_METRICS = {
+    'ENABLED': True,
+    'HEADERS': DEBUG,
+    'ON_BUDGET_EXCEEDED': 'raise' if TESTING else 'log',
+    'BUDGETS': {
+        'SeminarViewSet.list': 5,
+        'SeminarViewSet.retrieve': 4,
+        'SurveyResultViewSet.list': 5,
+        'SurveyResultViewSet.retrieve': 6,
+        'SurveyResultViewSet.stats': 2,
+        'UserViewSet.list': 3,
+        'UserViewSet.retrieve': 4,
+    },
+}
+
+# When serving waffle_backend.asgi, the read actions listed in a viewset's `async_actions` are served by
+# async views running the sync view on a pool of WORKERS threads, each holding its own DB connection.
+ASYNC_VIEWS = {
+    'ENABLED': os.getenv('ASYNC_VIEWS') in ('true', 'True'),
+    'WORKERS': int(os.getenv('ASYNC_VIEWS_WORKERS', 8)),
+}
+
+# Token -> user lookups are kept in process for TIMEOUT seconds; set ALIAS to a shared cache
+# to share them (and their invalidation) between processes.
+TOKEN_CACHE = {
+    'ALIAS': None,
+    'TIMEOUT': 60,
+    'MAX_SIZE': 10000,
+}
+
+
+# Password hashing and verification run on a bounded pool of WORKERS threads, with at most MAX_PENDING
+# more operations waiting; further ones are rejected with a 503. PASSWORD_HASHER_PROFILE picks the hashers,
+# ITERATIONS overrides the PBKDF2 cost, and stored hashes are upgraded on login when either changes.
+PASSWORD_HASHING = {
+    'WORKERS': int(os.getenv('PASSWORD_HASHING_WORKERS', 2)),
+    'MAX_PENDING': int(os.getenv('PASSWORD_HASHING_MAX_PENDING', 8)),
+    'ITERATIONS': int(os.getenv('PASSWORD_HASHING_ITERATIONS', 0)),
+}
+
+PASSWORD_HASHER_PROFILES = {
+    'default': [
+        'user.hashers.ConfigurablePBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+        'django.contrib.auth.hashers.Argon2PasswordHasher',
+        'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    ],
+    # Cheap hashes for tests; PBKDF2 hashes are still accepted and replaced on login.
+    'fast': [
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+        'user.hashers.ConfigurablePBKDF2PasswordHasher',
+    ],
+}
+PASSWORD_HASHER_PROFILE = os.getenv('PASSWORD_HASHER_PROFILE', 'fast' if TESTING else 'default')
+PASSWORD_HASHERS = PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE]
+
+AUTHENTICATION_BACKENDS = [
+    'user.backends.PooledModelBackend',
+]
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
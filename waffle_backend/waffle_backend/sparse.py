@@ -0,0 +1,73 @@
+from rest_framework.permissions import SAFE_METHODS
+
+from waffle_backend import conditional
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def parse_names(value):
+    return frozenset(name.strip() for name in value.split(',') if name.strip())
+
+
+def get_sparse_fields(request):
+    # '?fields=a,b' keeps only the listed fields and '?omit=c' drops fields; fields is None when not given.
+    fields = request.query_params.get(FIELDS_PARAM)
+    return (
+        parse_names(fields) if fields is not None else None,
+        parse_names(request.query_params.get(OMIT_PARAM, '')),
+    )
+
+
+def project(data, fields, omit):
+    # Applies a sparse fieldset to already serialized data, e.g. a cached full representation.
+    return {name: value for name, value in data.items() if (fields is None or name in fields) and name not in omit}
+
+
+class SparseFieldsMixin(object):
+    # Serializer mixin accepting `fields` and `omit`. Dropped fields are removed before serialization,
+    # so their SerializerMethodFields never run. Write-only fields are kept for validation.
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        omit = kwargs.pop('omit', None)
+        super(SparseFieldsMixin, self).__init__(*args, **kwargs)
+        for name, field in list(self.fields.items()):
+            if field.write_only:
+                continue
+            if (fields is not None and name not in fields) or (omit and name in omit):
+                self.fields.pop(name)
+
+
+class SparseFieldsViewMixin(object):
+    # Viewset mixin passing the request's sparse fieldset to the serializer of read requests.
+
+    def get_sparse_fields(self):
+        if not hasattr(self, '_sparse_fields'):
+            if self.request.method in SAFE_METHODS:
+                self._sparse_fields = get_sparse_fields(self.request)
+            else:
+                self._sparse_fields = (None, frozenset())
+        return self._sparse_fields
+
+    def is_sparse(self):
+        fields, omit = self.get_sparse_fields()
+        return fields is not None or bool(omit)
+
+    def is_requested(self, name):
+        fields, omit = self.get_sparse_fields()
+        return (fields is None or name in fields) and name not in omit
+
+    def get_sparse_etag(self, etag):
+        if not self.is_sparse():
+            return etag
+        fields, omit = self.get_sparse_fields()
+        return conditional.make_etag(etag, sorted(fields) if fields is not None else None, sorted(omit))
+
+    def get_serializer(self, *args, **kwargs):
+        fields, omit = self.get_sparse_fields()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        if omit:
+            kwargs.setdefault('omit', omit)
+        return super(SparseFieldsViewMixin, self).get_serializer(*args, **kwargs)
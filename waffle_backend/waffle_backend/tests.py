@@ -0,0 +1,173 @@
+import asyncio
+import datetime
+import decimal
+import io
+import json
+import threading
+import uuid
+from unittest import skipUnless
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from seminar.models import Seminar
+from seminar.tests import SeminarTestMixin
+from seminar.views import SeminarViewSet
+from waffle_backend import db
+from waffle_backend.asyncviews import async_read_view
+from waffle_backend.metrics import QueryBudgetExceeded, RequestMetricsMiddleware
+from waffle_backend.parsers import FastJSONParser
+from waffle_backend.renderers import FastJSONRenderer
+
+
+class RequestMetricsTestCase(SeminarTestMixin, TestCase):
+
+    def setUp(self):
+        super(RequestMetricsTestCase, self).setUp()
+        self.instructor = self.create_user('instructor', role='instructor')
+        self.seminar = self.create_seminar(self.instructor)
+
+    def test_metrics_headers(self):
+        config = dict(settings.REQUEST_METRICS, HEADERS=True)
+        with override_settings(REQUEST_METRICS=config):
+            response = self.client.get('/api/v1/seminar/{}/'.format(self.seminar.id))
+        self.assertEqual(response['X-Query-Count'], '3')
+        self.assertIn('serializer;dur=', response['Server-Timing'])
+
+    def test_query_budget_raises_under_test_runner(self):
+        self.assertEqual(settings.REQUEST_METRICS['ON_BUDGET_EXCEEDED'], 'raise')
+
+    def test_query_budget_exceeded(self):
+        config = dict(settings.REQUEST_METRICS, BUDGETS={'SeminarViewSet.retrieve': 2}, ON_BUDGET_EXCEEDED='raise')
+        with override_settings(REQUEST_METRICS=config):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get('/api/v1/seminar/{}/'.format(self.seminar.id))
+
+    def test_metrics_endpoint(self):
+        self.client.get('/api/v1/seminar/{}/'.format(self.seminar.id))
+        response = self.client.get('/api/v1/metrics/', **self.auth(self.instructor))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.instructor.is_staff = True
+        self.instructor.save()
+        data = self.client.get('/api/v1/metrics/', **self.auth(self.instructor)).json()
+        self.assertGreaterEqual(data['endpoints']['SeminarViewSet.retrieve']['count'], 1)
+        self.assertIn('hit_rate', data['seminar_cache'])
+        self.assertIn('hit_rate', data['token_cache'])
+        self.assertIn('reuse_rate', data['database'])
+
+
+class RendererTestCase(TestCase):
+
+    def test_fast_json_renderer_matches_json_renderer(self):
+        data = {
+            'datetime': timezone.make_aware(datetime.datetime(2021, 3, 1, 9, 30, 15, 123456), timezone.utc),
+            'naive': datetime.datetime(2021, 3, 1, 9, 30),
+            'date': datetime.date(2021, 3, 1),
+            'time': datetime.time(14, 0),
+            'decimal': decimal.Decimal('1.50'),
+            'uuid': uuid.UUID('12345678123456781234567812345678'),
+            'lazy': gettext_lazy('This field is required.'),
+            'text': '와플 스튜디오',
+            1: [1, 2.5, None, True],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_fast_json_parser(self):
+        body = FastJSONRenderer().render({'users': [1, 2], 'name': '와플'})
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(body)), {'users': [1, 2], 'name': '와플'})
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"users": '))
+
+    def test_api_uses_fast_renderer(self):
+        Seminar.objects.create(name='Django', capacity=10, count=5, time=datetime.time(14, 0), online=True)
+        response = self.client.get('/api/v1/seminar/')
+        self.assertIsInstance(response.accepted_renderer, FastJSONRenderer)
+        self.assertEqual(response.json()['results'][0]['name'], 'Django')
+
+
+class AsyncReadViewTestCase(SeminarTestMixin, TransactionTestCase):
+
+    def setUp(self):
+        super(AsyncReadViewTestCase, self).setUp()
+        self.instructor = self.create_user('instructor', role='instructor')
+        self.seminar = self.create_seminar(self.instructor)
+
+    def call(self, method, path, **kwargs):
+        threads = []
+        view = SeminarViewSet.as_view({'get': 'list', 'post': 'create'})
+
+        def record(request, *args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return view(request, *args, **kwargs)
+
+        request = getattr(AsyncRequestFactory(), method)(path, **kwargs)
+        response = async_to_sync(async_read_view(record))(request)
+        return response, threads[0]
+
+    def test_read_runs_on_pool(self):
+        response, thread = self.call('get', '/api/v1/seminar/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.is_rendered)
+        self.assertEqual(json.loads(response.content)['results'][0]['name'], 'waffle')
+        self.assertTrue(thread.startswith('read'))
+
+    def test_write_is_thread_sensitive(self):
+        response, thread = self.call('post', '/api/v1/seminar/', data={}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(thread.startswith('read'))
+
+    def test_async_metrics_middleware(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        self.assertTrue(asyncio.iscoroutinefunction(RequestMetricsMiddleware(get_response)))
+
+
+@skipUnless(isinstance(connections['default'], db.ConnectionMetricsMixin), "needs a backend from waffle_backend.db")
+class DatabaseConnectionTestCase(TransactionTestCase):
+
+    def setUp(self):
+        self.connection = connection = connections['default']
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest("In-memory SQLite connections are never closed, so they cannot be reopened")
+        patcher = patch.dict(connection.settings_dict, {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(connection.close)
+        connection.close()
+        db.reset()
+        connection.ensure_connection()
+
+    def test_connection_reuse(self):
+        connection = self.connection
+        for _ in range(3):
+            close_old_connections()
+            connection.ensure_connection()
+            connection.ensure_connection()
+        stats = db.stats()
+        self.assertEqual(stats['connects'], 1)
+        self.assertEqual(stats['reuses'], 3)
+        self.assertEqual(stats['health_checks'], 3)
+        self.assertEqual(stats['reuse_rate'], 0.75)
+
+    def test_health_check_replaces_dropped_connection(self):
+        connection = self.connection
+        close_old_connections()
+        with patch.object(connection, 'is_usable', return_value=False):
+            connection.ensure_connection()
+        self.assertTrue(connection.is_usable())
+        stats = db.stats()
+        self.assertEqual(stats['connects'], 2)
+        self.assertEqual(stats['reuses'], 0)
+        self.assertEqual(stats['health_check_failures'], 1)